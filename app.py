@@ -67,10 +67,17 @@ if 'playwright_installed' not in st.session_state:
 
 # Import project modules
 import config
-from pdf_processor import process_uploaded_pdfs
+from pdf_processor import process_uploaded_pdfs, iter_pdf_chunks
+from ingestion_cache import get_ingestion_cache
+from page_filter import PageFilterStats
+from collection_registry import CollectionRegistry, maybe_collect_garbage, new_collection_name
+from retrieval_cache import get_retrieval_cache
+from ingestion_service import get_ingestion_service
+from query_embeddings import load_query_embeddings
 from vector_store import (
     get_embedding_function,
     setup_vector_store,
+    setup_vector_store_streaming,
     load_existing_vector_store
 )
 # Updated imports from llm_interface
@@ -157,6 +164,7 @@ def initialize_embeddings():
     """Initialize and cache the embedding function"""
     try:
         embedding_function = get_embedding_function()
+        load_query_embeddings(embedding_function) # Precomputed attribute query vectors (QUERY_EMBEDDINGS_ENABLED)
         return embedding_function
     except Exception as e:
         logger.error(f"Failed to initialize embeddings: {e}", exc_info=True)
@@ -191,6 +199,13 @@ def main():
         st.session_state.scraped_table_html_cache = None
     if 'current_part_number_scraped' not in st.session_state:
         st.session_state.current_part_number_scraped = None
+    if 'ingestion_cache_stats' not in st.session_state:
+        st.session_state.ingestion_cache_stats = None
+    if 'page_filter_stats' not in st.session_state:
+        st.session_state.page_filter_stats = None
+    if 'collection_name' not in st.session_state:
+        st.session_state.collection_name = new_collection_name() # The shared collection unless COLLECTION_SCOPE is "session" or "job"
+    maybe_collect_garbage() # Drop expired session/job collections
 
     # Add a header for the extraction page
     st.markdown("<h1 style='text-align: center;'>Document Extraction</h1>", unsafe_allow_html=True)
@@ -227,7 +242,7 @@ def main():
     # Load existing data if available
     if st.session_state.retriever is None and config.CHROMA_SETTINGS.is_persistent and embedding_function:
         logger.info("Attempting to load existing vector store...")
-        st.session_state.retriever = load_existing_vector_store(embedding_function)
+        st.session_state.retriever = load_existing_vector_store(embedding_function, st.session_state.collection_name)
         if st.session_state.retriever:
             logger.success("Successfully loaded retriever from persistent storage.")
             st.session_state.processed_files = ["Existing data loaded from disk"]
@@ -242,6 +257,8 @@ def main():
             st.session_state.extraction_performed = False # Ensure flag is false on load
         else:
             logger.warning("No existing persistent vector store found or failed to load.")
+    elif st.session_state.retriever is not None and config.CHROMA_SETTINGS.is_persistent:
+        CollectionRegistry().touch(st.session_state.collection_name) # Keeps an active session's collection from expiring
 
     # Render sidebar
     with st.sidebar:
@@ -279,23 +296,49 @@ def main():
                 st.session_state.extraction_performed = False
                 st.session_state.scraped_table_html_cache = None
                 st.session_state.current_part_number_scraped = None
+                st.session_state.ingestion_cache_stats = None
+                st.session_state.page_filter_stats = None
                 if 'gt_editor' in st.session_state:
                     del st.session_state['gt_editor']
 
                 filenames = [f.name for f in uploaded_files]
+                if config.COLLECTION_SCOPE == "job":
+                    st.session_state.collection_name = new_collection_name() # Each run indexes into its own collection
+                ingestion_cache = get_ingestion_cache() # Fresh hit/miss counters for this run
+                page_filter_stats = PageFilterStats()
                 logger.info(f"Starting processing for {len(filenames)} files: {', '.join(filenames)}")
-                # --- PDF Processing ---
-                with st.spinner("Processing PDFs... Loading, cleaning, splitting..."):
-                    processed_docs = None # Initialize
-                    try:
-                        start_time = time.time()
-                        temp_dir = os.path.join(os.getcwd(), "temp_pdf_files")
-                        processed_docs = process_uploaded_pdfs(uploaded_files, temp_dir)
-                        processing_time = time.time() - start_time
-                        logger.info(f"PDF processing took {processing_time:.2f} seconds.")
-                    except Exception as e:
-                        logger.error(f"Failed during PDF processing phase: {e}", exc_info=True)
-                        st.error(f"Error processing PDFs: {e}")
+                # --- Streaming: parse, embed and index in one overlapped pass ---
+                if config.STREAMING_INGESTION:
+                    with st.spinner("Processing and indexing PDFs (streaming)..."):
+                        try:
+                            start_time = time.time()
+                            temp_dir = os.path.join(os.getcwd(), "temp_pdf_files")
+                            st.session_state.retriever = setup_vector_store_streaming(
+                                iter_pdf_chunks(uploaded_files, temp_dir, cache=ingestion_cache, filter_stats=page_filter_stats,
+                                                part_number=st.session_state.get("part_number_input")),
+                                embedding_function,
+                                cache=ingestion_cache,
+                                collection_name=st.session_state.collection_name,
+                            )
+                            logger.info(f"Streaming ingestion took {time.time() - start_time:.2f} seconds.")
+                        except Exception as e:
+                            logger.error(f"Error during streaming ingestion: {e}", exc_info=True)
+                            st.error(f"Error processing PDFs: {e}")
+                    processed_docs = None
+                else:
+                    # --- PDF Processing ---
+                    with st.spinner("Processing PDFs... Loading, cleaning, splitting..."):
+                        processed_docs = None # Initialize
+                        try:
+                            start_time = time.time()
+                            temp_dir = os.path.join(os.getcwd(), "temp_pdf_files")
+                            processed_docs = process_uploaded_pdfs(uploaded_files, temp_dir, cache=ingestion_cache, filter_stats=page_filter_stats,
+                                                                   part_number=st.session_state.get("part_number_input"))
+                            processing_time = time.time() - start_time
+                            logger.info(f"PDF processing took {processing_time:.2f} seconds.")
+                        except Exception as e:
+                            logger.error(f"Failed during PDF processing phase: {e}", exc_info=True)
+                            st.error(f"Error processing PDFs: {e}")
 
                 # --- Vector Store Indexing ---
                 if processed_docs:
@@ -303,30 +346,37 @@ def main():
                     with st.spinner("Indexing documents in vector store..."):
                         try:
                             start_time = time.time()
-                            st.session_state.retriever = setup_vector_store(processed_docs, embedding_function)
+                            st.session_state.retriever = setup_vector_store(processed_docs, embedding_function, cache=ingestion_cache,
+                                                                           collection_name=st.session_state.collection_name)
                             indexing_time = time.time() - start_time
                             logger.info(f"Vector store setup took {indexing_time:.2f} seconds.")
-
-                            if st.session_state.retriever:
-                                st.session_state.processed_files = filenames # Update list
-                                logger.success("Vector store setup complete. Retriever is ready.")
-                                # --- Create BOTH Extraction Chains --- 
-                                with st.spinner("Preparing extraction engines..."):
-                                     st.session_state.pdf_chain = create_pdf_extraction_chain(st.session_state.retriever, llm)
-                                     st.session_state.web_chain = create_web_extraction_chain(llm)
-                                if st.session_state.pdf_chain and st.session_state.web_chain:
-                                    logger.success("Extraction chains created.")
-                                    # Keep extraction_performed as False here, it will run in the main section
-                                    st.success(f"Successfully processed {len(filenames)} file(s). Evaluation below.") # Update message
-                                else:
-                                    st.error("Failed to create one or both extraction chains after processing.")
-                            else:
+                            if not st.session_state.retriever:
                                 st.error("Failed to setup vector store after processing PDFs.")
                         except Exception as e:
                             logger.error(f"Error setting up vector store: {e}", exc_info=True)
                             st.error(f"Error setting up vector store: {e}")
-                else:
+                elif not config.STREAMING_INGESTION:
                     st.warning("No text could be extracted or processed from the uploaded PDFs.")
+                elif not st.session_state.retriever:
+                    st.warning("No text could be extracted or indexed from the uploaded PDFs.")
+
+                if ingestion_cache:
+                    st.session_state.ingestion_cache_stats = ingestion_cache.stats()
+                st.session_state.page_filter_stats = page_filter_stats.as_dict()
+
+                if st.session_state.retriever:
+                    st.session_state.processed_files = filenames # Update list
+                    logger.success("Vector store setup complete. Retriever is ready.")
+                    # --- Create BOTH Extraction Chains --- 
+                    with st.spinner("Preparing extraction engines..."):
+                         st.session_state.pdf_chain = create_pdf_extraction_chain(st.session_state.retriever, llm, sources=filenames)
+                         st.session_state.web_chain = create_web_extraction_chain(llm)
+                    if st.session_state.pdf_chain and st.session_state.web_chain:
+                        logger.success("Extraction chains created.")
+                        # Keep extraction_performed as False here, it will run in the main section
+                        st.success(f"Successfully processed {len(filenames)} file(s). Evaluation below.") # Update message
+                    else:
+                        st.error("Failed to create one or both extraction chains after processing.")
         elif process_button:
             st.warning("Please upload at least one PDF file before processing.")
 
@@ -341,6 +391,24 @@ def main():
         st.success(f"Ready. Using existing data loaded from disk.") # Assuming chains created on load
     else:
         st.info("Upload and process PDF documents to view extracted data.")
+    if st.session_state.ingestion_cache_stats:
+        cache_stats = st.session_state.ingestion_cache_stats
+        st.caption(f"Ingestion cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es)")
+    filter_stats = st.session_state.page_filter_stats
+    if filter_stats and (filter_stats['pages_skipped'] or filter_stats['pages_tiered']):
+        st.caption(f"Page prefilter: skipped {filter_stats['pages_skipped']} and down-tiered {filter_stats['pages_tiered']} "
+                   f"of {filter_stats['pages_seen']} page(s), ~{filter_stats['tokens_saved']} tokens not embedded")
+    ingestion_service = get_ingestion_service()
+    if ingestion_service:
+        writer_stats = ingestion_service.stats()
+        if writer_stats['completed'] or writer_stats['queue_depth']:
+            st.caption(f"Ingestion writer: {writer_stats['queue_depth']} job(s) queued, wait p50 {writer_stats['wait_p50']:.2f}s, "
+                       f"max {writer_stats['wait_max']:.2f}s over recent jobs")
+    retrieval_cache = get_retrieval_cache()
+    if retrieval_cache and (retrieval_cache.hits or retrieval_cache.misses):
+        retrieval_stats = retrieval_cache.stats()
+        st.caption(f"Retrieval cache: {retrieval_stats['hits']} hit(s), {retrieval_stats['misses']} miss(es) "
+                   f"({retrieval_stats['hit_rate']:.0%} hit rate)")
 
     # Render extraction results
     st.header("2. Extracted Information")
@@ -0,0 +1,116 @@
+# benchmarks/bench_embeddings.py
+"""
+Compares the embedding backends on chunks of the synthetic datasheet corpus:
+PyTorch SentenceTransformers (the current embeddings) against ONNX Runtime in fp32
+and dynamically quantized int8, at one or more thread counts. Each backend runs in a
+fresh process so peak RSS includes its own imports (torch or onnxruntime) only.
+Reports texts/sec, load time and peak RSS, and checks cosine parity of every ONNX
+variant against the PyTorch vectors (fails below --min-cosine).
+
+Usage:
+    python benchmarks/bench_embeddings.py --files 10 --threads 1,2,4
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+# common sets up sys.path, the sqlite override and offline mode; import it first
+from common import compare_results, peak_rss_mb, run_metadata, write_results
+from synthetic_datasheets import make_corpus
+
+METRICS = ["reference_texts_per_sec", "best_onnx_texts_per_sec", "reference_peak_rss_mb", "best_onnx_peak_rss_mb"]
+
+def _chunk_texts(files: int, seed: int):
+    from pdf_processor import process_uploaded_pdfs
+    docs = process_uploaded_pdfs(make_corpus(files, seed=seed), "temp_pdf", 1, None)
+    return [doc.page_content for doc in docs]
+
+def _run_backend(backend: str, threads: int, texts):
+    """Runs in a spawned process: loads one backend, embeds the texts, reports timings and RSS."""
+    import config
+    start = time.perf_counter()
+    if backend == "pytorch":
+        from embedding_engine import BatchedEmbeddings
+        embeddings = BatchedEmbeddings(processes=1)
+    else:
+        from embedding_engine import OnnxEmbeddings
+        embeddings = OnnxEmbeddings(threads=threads, quantize=backend == "onnx-int8")
+    load_seconds = time.perf_counter() - start
+    embeddings.embed_documents(texts[:8]) # Warm-up
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    seconds = time.perf_counter() - start
+    return {
+        "backend": backend,
+        "threads": threads,
+        "model": config.EMBEDDING_MODEL_NAME,
+        "load_seconds": load_seconds,
+        "embed_seconds": seconds,
+        "texts_per_sec": len(texts) / seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "vectors": vectors,
+    }
+
+def main():
+    from embedding_engine import cosine_parity, default_onnx_threads
+
+    parser = argparse.ArgumentParser(description="Compare PyTorch and ONNX Runtime embedding backends.")
+    parser.add_argument("--files", type=int, default=10, help="Synthetic datasheets to chunk for input texts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threads", default=None, help="Comma-separated ONNX thread counts (default: available CPUs)")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Parity threshold against the PyTorch vectors")
+    parser.add_argument("--output", default=None, help="JSON results file (default: benchmarks/results/embeddings-<ts>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    texts = _chunk_texts(args.files, args.seed)
+    print(f"Embedding {len(texts)} chunk texts")
+    thread_counts = [int(t) for t in args.threads.split(",")] if args.threads else [default_onnx_threads()]
+
+    runs = [("pytorch", 0)] + [(backend, threads) for backend in ("onnx-fp32", "onnx-int8") for threads in thread_counts]
+    results_by_run = []
+    context = multiprocessing.get_context("spawn")
+    for backend, threads in runs:
+        with context.Pool(1) as pool:
+            results_by_run.append(pool.apply(_run_backend, (backend, threads, texts)))
+
+    reference = results_by_run[0]
+    reference_vectors = reference.pop("vectors")
+    reference["parity"] = None
+    failed = False
+    print(f"{'backend':<10} {'threads':>7} {'texts/s':>10} {'load s':>8} {'peak MB':>9} {'min cos':>8} {'mean cos':>9}")
+    for run in results_by_run:
+        if run is not reference:
+            run["parity"] = cosine_parity(reference_vectors, run.pop("vectors"))
+            failed |= run["parity"]["min"] < args.min_cosine
+        parity = run["parity"] or {"min": 1.0, "mean": 1.0}
+        print(f"{run['backend']:<10} {run['threads']:>7} {run['texts_per_sec']:>10.1f} {run['load_seconds']:>8.2f} "
+              f"{run['peak_rss_mb']:>9.1f} {parity['min']:>8.4f} {parity['mean']:>9.4f}")
+
+    onnx_runs = results_by_run[1:]
+    best = max(onnx_runs, key=lambda run: run["texts_per_sec"])
+    results = {
+        "meta": run_metadata(),
+        "params": vars(args),
+        "runs": results_by_run,
+        "metrics": {
+            "texts": len(texts),
+            "reference_texts_per_sec": reference["texts_per_sec"],
+            "reference_peak_rss_mb": reference["peak_rss_mb"],
+            "best_onnx_backend": f"{best['backend']}x{best['threads']}",
+            "best_onnx_texts_per_sec": best["texts_per_sec"],
+            "best_onnx_peak_rss_mb": best["peak_rss_mb"],
+            "min_cosine": min(run["parity"]["min"] for run in onnx_runs),
+        },
+    }
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         f"embeddings-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    write_results(results, output)
+    if args.compare:
+        compare_results(results, args.compare, METRICS)
+    if failed:
+        raise SystemExit(f"Parity check failed: an ONNX backend is below cosine {args.min_cosine} against PyTorch")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/bench_hnsw.py
+"""
+HNSW parameter sweep for the Chroma backend: for every combination of M,
+construction_ef and search_ef, builds a throw-away Chroma collection from the same
+vectors and reports build time, query latency p50/p99 and recall@k against exact
+cosine search. Use it to pick CHROMA_HNSW_M / _CONSTRUCTION_EF / _SEARCH_EF.
+
+Vectors come from an existing collection (--collection) or from the synthetic
+datasheet corpus; queries are the PDF chain's attribute queries plus stored chunks.
+
+Usage:
+    python benchmarks/bench_hnsw.py --files 30 --m 8,16,32 --construction-ef 100,200 --search-ef 10,50,100
+    python benchmarks/bench_hnsw.py --collection pdf_qa_prod_collection --embedding model
+"""
+import argparse
+import itertools
+import os
+import shutil
+import tempfile
+import time
+
+# common sets up sys.path, the sqlite override and offline mode; import it first
+from common import benchmark_queries, benchmark_vectors, compare_results, get_benchmark_embeddings, run_metadata, write_results
+
+import numpy as np
+
+import config
+
+METRICS = ["best_recall", "best_query_p50_ms", "best_query_p99_ms", "best_build_seconds"]
+_ADD_BATCH_SIZE = 1000
+
+def _int_list(value: str):
+    return [int(item) for item in value.split(",") if item]
+
+def _exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int):
+    unit_vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+    unit_queries = queries / np.linalg.norm(queries, axis=1, keepdims=True).clip(min=1e-12)
+    scores = unit_queries @ unit_vectors.T
+    return [set(np.argsort(-row)[:k].tolist()) for row in scores]
+
+def _run(client, vectors: np.ndarray, queries: np.ndarray, truth, k: int, space: str, m: int, construction_ef: int, search_ef: int) -> dict:
+    name = f"bench-hnsw-m{m}-c{construction_ef}-s{search_ef}"
+    collection = client.create_collection(name, metadata={
+        "hnsw:space": space, "hnsw:M": m, "hnsw:construction_ef": construction_ef, "hnsw:search_ef": search_ef,
+    })
+    start = time.perf_counter()
+    for batch_start in range(0, len(vectors), _ADD_BATCH_SIZE):
+        batch = vectors[batch_start:batch_start + _ADD_BATCH_SIZE]
+        collection.add(ids=[str(batch_start + i) for i in range(len(batch))], embeddings=batch.tolist())
+    collection.query(query_embeddings=queries[:1].tolist(), n_results=k) # Warm-up: loads the index
+    build_seconds = time.perf_counter() - start
+
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(expected & {int(doc_id) for doc_id in result["ids"][0]}) / max(len(expected), 1))
+    client.delete_collection(name)
+    return {
+        "m": m,
+        "construction_ef": construction_ef,
+        "search_ef": search_ef,
+        "build_seconds": build_seconds,
+        "query_p50_ms": float(np.percentile(latencies, 50)),
+        "query_p99_ms": float(np.percentile(latencies, 99)),
+        "recall": float(np.mean(recalls)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep Chroma HNSW parameters: build time, query p50/p99 and recall@k.")
+    parser.add_argument("--collection", default=None, help="Existing collection to read vectors from (default: synthetic corpus)")
+    parser.add_argument("--files", type=int, default=20, help="Synthetic datasheets when no --collection is given")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embedding", choices=["hash", "model"], default="hash",
+                        help="Embeddings for the corpus and the attribute queries (use 'model' with --collection)")
+    parser.add_argument("--k", type=int, default=config.RETRIEVER_K)
+    parser.add_argument("--sample-queries", type=int, default=200, help="Stored chunk vectors used as extra queries")
+    parser.add_argument("--space", default=config.CHROMA_HNSW_SPACE)
+    parser.add_argument("--m", default=str(config.CHROMA_HNSW_M), help="Comma-separated M values")
+    parser.add_argument("--construction-ef", default=str(config.CHROMA_HNSW_CONSTRUCTION_EF), help="Comma-separated construction_ef values")
+    parser.add_argument("--search-ef", default=f"{config.CHROMA_HNSW_SEARCH_EF},50,100", help="Comma-separated search_ef values")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Recall the 'best' (fastest p99) setting must reach")
+    parser.add_argument("--output", default=None, help="JSON results file (default: benchmarks/results/hnsw-<ts>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    import chromadb
+
+    embeddings = get_benchmark_embeddings(args.embedding)
+    vectors, _ = benchmark_vectors(args.collection, args.files, args.seed, embeddings)
+    if not len(vectors):
+        raise SystemExit("No vectors to benchmark")
+    queries = benchmark_queries(vectors, embeddings, args.sample_queries, args.seed)
+    truth = _exact_top_k(vectors, queries, args.k)
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}, space={args.space}")
+
+    work_dir = tempfile.mkdtemp(prefix="bench_hnsw_")
+    runs = []
+    try:
+        client = chromadb.PersistentClient(path=work_dir)
+        print(f"{'M':>4} {'build_ef':>8} {'search_ef':>9} {'build s':>8} {'p50 ms':>7} {'p99 ms':>7} {'recall@' + str(args.k):>10}")
+        for m, construction_ef, search_ef in itertools.product(_int_list(args.m), _int_list(args.construction_ef), _int_list(args.search_ef)):
+            run = _run(client, vectors, queries, truth, args.k, args.space, m, construction_ef, search_ef)
+            runs.append(run)
+            print(f"{m:>4} {construction_ef:>8} {search_ef:>9} {run['build_seconds']:>8.2f} "
+                  f"{run['query_p50_ms']:>7.2f} {run['query_p99_ms']:>7.2f} {run['recall']:>10.4f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    eligible = [run for run in runs if run["recall"] >= args.min_recall] or runs
+    best = min(eligible, key=lambda run: run["query_p99_ms"])
+    print(f"Fastest setting with recall >= {args.min_recall}: M={best['m']}, construction_ef={best['construction_ef']}, search_ef={best['search_ef']}")
+    results = {
+        "meta": run_metadata(),
+        "params": vars(args),
+        "runs": runs,
+        "metrics": {
+            "vectors": len(vectors),
+            "queries": len(queries),
+            "best_setting": f"M={best['m']},construction_ef={best['construction_ef']},search_ef={best['search_ef']}",
+            "best_recall": best["recall"],
+            "best_query_p50_ms": best["query_p50_ms"],
+            "best_query_p99_ms": best["query_p99_ms"],
+            "best_build_seconds": best["build_seconds"],
+        },
+    }
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         f"hnsw-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    write_results(results, output)
+    if args.compare:
+        compare_results(results, args.compare, METRICS)
+
+if __name__ == "__main__":
+    main()
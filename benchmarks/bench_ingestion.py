@@ -0,0 +1,121 @@
+# benchmarks/bench_ingestion.py
+"""
+Offline ingestion benchmark: generates a synthetic datasheet corpus, runs
+process_uploaded_pdfs and setup_vector_store (or the streaming variant) into a
+throw-away Chroma directory, and reports pages/sec, chunks/sec, embeddings/sec and
+peak RSS. Results are stored as JSON so runs can be compared.
+
+Usage:
+    python benchmarks/bench_ingestion.py --files 30 --workers 4
+    python benchmarks/bench_ingestion.py --files 30 --compare benchmarks/results/ingestion-<ts>.json
+"""
+import argparse
+import os
+import tempfile
+import time
+
+# common sets up sys.path, the sqlite override and offline mode; import it first
+from common import CountingEmbeddings, compare_results, get_benchmark_embeddings, peak_rss_mb, run_metadata, write_results
+from synthetic_datasheets import make_corpus
+
+import fitz # PyMuPDF
+
+import config
+from ingestion_cache import IngestionCache
+from page_filter import PageFilterStats
+from pdf_processor import iter_pdf_chunks, process_uploaded_pdfs
+from vector_store import setup_vector_store, setup_vector_store_streaming
+
+METRICS = ["pages_per_sec", "chunks_per_sec", "embeddings_per_sec", "total_seconds", "peak_rss_mb"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF ingestion and indexing offline.")
+    parser.add_argument("--files", type=int, default=20, help="Synthetic datasheets to generate")
+    parser.add_argument("--spec-pages", type=int, default=1)
+    parser.add_argument("--drawing-pages", type=int, default=3)
+    parser.add_argument("--boilerplate-pages", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=config.PDF_INGEST_WORKERS, help="PDF process pool size (1 = serial)")
+    parser.add_argument("--streaming", action="store_true", help="Use setup_vector_store_streaming")
+    parser.add_argument("--cache-dir", default=None, help="Ingestion cache directory (reuse it across runs to measure hits)")
+    parser.add_argument("--embedding", choices=["hash", "model"], default="hash",
+                        help="'hash' = offline fake embeddings, 'model' = configured model from the local cache")
+    parser.add_argument("--output", default=None, help="JSON results file (default: benchmarks/results/ingestion-<ts>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    uploads = make_corpus(args.files, args.spec_pages, args.drawing_pages, args.boilerplate_pages, args.seed)
+    pages = 0
+    for upload in uploads:
+        with fitz.open(stream=upload.getvalue(), filetype="pdf") as pdf:
+            pages += pdf.page_count
+    print(f"Generated {len(uploads)} PDF(s), {pages} page(s)")
+
+    embeddings = CountingEmbeddings(get_benchmark_embeddings(args.embedding))
+    work_dir = tempfile.mkdtemp(prefix="bench_ingestion_")
+    config.CHROMA_PERSIST_DIRECTORY = os.path.join(work_dir, "chroma")
+    config.COLLECTION_NAME = "bench_ingestion"
+    cache = IngestionCache(args.cache_dir) if args.cache_dir else None
+    filter_stats = PageFilterStats()
+
+    start = time.perf_counter()
+    if args.streaming:
+        chunks = 0
+
+        def counted(stream):
+            nonlocal chunks
+            for batch in stream:
+                chunks += len(batch)
+                yield batch
+
+        retriever = setup_vector_store_streaming(
+            counted(iter_pdf_chunks(uploads, work_dir, args.workers, cache, filter_stats)), embeddings, cache=cache
+        )
+        parse_seconds = None
+    else:
+        docs = process_uploaded_pdfs(uploads, work_dir, args.workers, cache, filter_stats)
+        parse_seconds = time.perf_counter() - start
+        chunks = len(docs)
+        retriever = setup_vector_store(docs, embeddings, cache=cache)
+    total_seconds = time.perf_counter() - start
+    if retriever is None:
+        raise SystemExit("Indexing failed; see the log above.")
+
+    results = {
+        "meta": run_metadata(),
+        "params": {
+            **vars(args),
+            "chunking_strategy": config.CHUNKING_STRATEGY,
+            "chunk_size": config.CHUNK_SIZE,
+            "chunk_overlap": config.CHUNK_OVERLAP,
+            "extract_tables": config.EXTRACT_TABLES,
+            "page_filter_mode": config.PAGE_FILTER_MODE,
+        },
+        "metrics": {
+            "files": len(uploads),
+            "pages": pages,
+            "chunks": chunks,
+            "embedded_texts": embeddings.texts,
+            "parse_seconds": parse_seconds,
+            "total_seconds": total_seconds,
+            "embedding_seconds": embeddings.seconds,
+            "pages_per_sec": pages / total_seconds,
+            "chunks_per_sec": chunks / total_seconds,
+            "embeddings_per_sec": embeddings.texts / embeddings.seconds if embeddings.seconds else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "page_filter": filter_stats.as_dict(),
+            "cache": cache.stats() if cache else None,
+        },
+    }
+    for metric in METRICS:
+        value = results["metrics"][metric]
+        print(f"{metric:<24} {value:.2f}" if value is not None else f"{metric:<24} n/a")
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         f"ingestion-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    write_results(results, output)
+    if args.compare:
+        compare_results(results, args.compare, METRICS)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_quantization.py
+"""
+Recall benchmark for the NumPy store's vector compression: int8 / binary
+quantization with exact rescoring (NUMPY_STORE_QUANTIZATION) and dimension
+truncation (NUMPY_STORE_DIMENSIONS). Each variant is built from the same vectors in
+a throw-away directory and compared with exact float32 search over the full vectors:
+recall@k, query latency and bytes held in memory (codes) or on disk (vectors).
+
+Vectors come from an existing collection of the configured backend (--collection,
+e.g. the production one) or from the synthetic datasheet corpus. Queries are the PDF
+chain's attribute queries plus a sample of stored chunk vectors.
+
+Usage:
+    python benchmarks/bench_quantization.py --collection pdf_qa_prod_collection --embedding model
+    python benchmarks/bench_quantization.py --files 30 --dimensions 256,128
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+# common sets up sys.path, the sqlite override and offline mode; import it first
+from common import benchmark_queries, benchmark_vectors, compare_results, get_benchmark_embeddings, run_metadata, write_results
+
+import numpy as np
+
+import config
+from numpy_store import NumpyCollection
+
+METRICS = ["int8_recall", "binary_recall", "int8_query_ms", "binary_query_ms", "exact_query_ms"]
+
+def _search(collection: NumpyCollection, queries: np.ndarray, k: int):
+    collection.query_many(queries[:1], k) # Warm-up (maps the vectors)
+    start = time.perf_counter()
+    hits = collection.query_many(queries, k)
+    return [[row for row, _ in query_hits] for query_hits in hits], (time.perf_counter() - start) * 1000 / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k of quantized / truncated NumPy store vectors against exact search.")
+    parser.add_argument("--collection", default=None, help="Existing collection to read vectors from (default: synthetic corpus)")
+    parser.add_argument("--files", type=int, default=20, help="Synthetic datasheets when no --collection is given")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embedding", choices=["hash", "model"], default="hash",
+                        help="Embeddings for the corpus and the attribute queries (use 'model' with --collection)")
+    parser.add_argument("--k", type=int, default=config.RETRIEVER_K)
+    parser.add_argument("--sample-queries", type=int, default=200, help="Stored chunk vectors used as extra queries")
+    parser.add_argument("--dimensions", default="", help="Comma-separated truncation sizes to test, e.g. 256,128")
+    parser.add_argument("--rescore-factor", type=int, default=config.NUMPY_STORE_RESCORE_FACTOR)
+    parser.add_argument("--output", default=None, help="JSON results file (default: benchmarks/results/quantization-<ts>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    embeddings = get_benchmark_embeddings(args.embedding)
+    vectors, texts = benchmark_vectors(args.collection, args.files, args.seed, embeddings)
+    if not len(vectors):
+        raise SystemExit("No vectors to benchmark")
+    queries = benchmark_queries(vectors, embeddings, args.sample_queries, args.seed)
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+
+    config.NUMPY_STORE_RESCORE_FACTOR = args.rescore_factor
+    ids = [str(row) for row in range(len(vectors))]
+    work_dir = tempfile.mkdtemp(prefix="bench_quantization_")
+    variants = [(quantization, 0) for quantization in ("none", "int8", "binary")]
+    variants += [(quantization, int(dims)) for dims in args.dimensions.split(",") if dims for quantization in ("none", "int8")]
+    runs, truth = [], None
+    try:
+        for quantization, dims in variants:
+            directory = os.path.join(work_dir, f"{quantization}-{dims}")
+            collection = NumpyCollection(directory, "float32" if (quantization, dims) == ("none", 0) else config.NUMPY_STORE_DTYPE, quantization, dims)
+            collection.upsert(ids, vectors, texts, [{} for _ in ids])
+            collection.persist()
+            collection = NumpyCollection(directory, collection.dtype.name, quantization, dims) # Reopen: memory-mapped as in the app
+            hits, query_ms = _search(collection, queries, args.k)
+            if truth is None:
+                truth = hits # The first variant is exact float32 search over the full vectors
+            recall = float(np.mean([len(set(found) & set(expected)) / max(len(expected), 1) for found, expected in zip(hits, truth)]))
+            run = {
+                "quantization": quantization,
+                "dimensions": dims or int(vectors.shape[1]),
+                "truncated": bool(dims),
+                "recall": recall,
+                "query_ms": query_ms,
+                "memory_bytes": int(collection._codes.nbytes) if collection._codes is not None else os.path.getsize(collection.vectors_path),
+                "disk_bytes": os.path.getsize(collection.vectors_path) + (os.path.getsize(collection.codes_path) if os.path.exists(collection.codes_path) else 0),
+            }
+            runs.append(run)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'variant':<14} {'dims':>5} {'recall@' + str(args.k):>10} {'ms/query':>9} {'memory MB':>10} {'disk MB':>8}")
+    for run in runs:
+        print(f"{run['quantization']:<14} {run['dimensions']:>5} {run['recall']:>10.4f} {run['query_ms']:>9.3f} "
+              f"{run['memory_bytes'] / 1e6:>10.2f} {run['disk_bytes'] / 1e6:>8.2f}")
+
+    full = {run["quantization"]: run for run in runs if not run["truncated"]}
+    results = {
+        "meta": run_metadata(),
+        "params": vars(args),
+        "runs": runs,
+        "metrics": {
+            "vectors": len(vectors),
+            "queries": len(queries),
+            "exact_query_ms": full["none"]["query_ms"],
+            "int8_recall": full["int8"]["recall"],
+            "int8_query_ms": full["int8"]["query_ms"],
+            "binary_recall": full["binary"]["recall"],
+            "binary_query_ms": full["binary"]["query_ms"],
+        },
+    }
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         f"quantization-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    write_results(results, output)
+    if args.compare:
+        compare_results(results, args.compare, METRICS)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# benchmarks/common.py
+"""Shared helpers for the offline benchmarks: import setup, fake embeddings, RSS and result files."""
+import hashlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+# Benchmarks run from the repo root or from benchmarks/; make the app modules importable
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# Same sqlite override as app.py (chromadb needs sqlite >= 3.35), when pysqlite3 is installed
+try:
+    __import__('pysqlite3')
+    sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+except ImportError:
+    pass
+
+# Never reach out to the Hugging Face Hub from a benchmark; use the local model cache only
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words hashing embeddings. Lets the pipeline benchmarks run
+    without any model download; use --embedding model to measure the real encoder.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in text.lower().split():
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+class CountingEmbeddings(Embeddings):
+    """Wraps an embedding function and records how many texts it encoded and how long it took."""
+
+    def __init__(self, inner: Embeddings):
+        self.inner = inner
+        self.texts = 0
+        self.seconds = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        vectors = self.inner.embed_documents(texts)
+        self.seconds += time.perf_counter() - start
+        self.texts += len(texts)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        vector = self.inner.embed_query(text)
+        self.seconds += time.perf_counter() - start
+        self.texts += 1
+        return vector
+
+def get_benchmark_embeddings(kind: str) -> Embeddings:
+    """
+    'hash' for the offline fake, 'model' for vector_store.get_embedding_function()
+    without the persistent embedding cache, so every run times the model itself.
+    """
+    if kind == "hash":
+        return HashEmbeddings()
+    from vector_store import get_embedding_function
+    return get_embedding_function(use_cache=False)
+
+def benchmark_vectors(collection_name: Optional[str], files: int, seed: int, embeddings: Embeddings):
+    """
+    (vectors, texts) of an existing collection of the configured backend, or of the
+    chunks of a synthetic corpus embedded with the given embeddings.
+    """
+    if collection_name:
+        from vector_store import open_vector_store
+        stored = open_vector_store(embeddings, collection_name)._collection.get(include=["embeddings", "documents"])
+        return np.asarray(stored["embeddings"], dtype=np.float32), stored["documents"]
+    from pdf_processor import process_uploaded_pdfs
+    from synthetic_datasheets import make_corpus
+    texts = [doc.page_content for doc in process_uploaded_pdfs(make_corpus(files, seed=seed), "temp_pdf", 1, None)]
+    return np.asarray(embeddings.embed_documents(texts), dtype=np.float32), texts
+
+def benchmark_queries(vectors: np.ndarray, embeddings: Embeddings, samples: int, seed: int) -> np.ndarray:
+    """The PDF chain's attribute queries plus a sample of the stored vectors, as a (queries x dims) array."""
+    from query_embeddings import ATTRIBUTE_KEYWORDS, ATTRIBUTE_QUERY_TEMPLATE, PART_NUMBER_QUERY_TEMPLATE
+    query_template = f"{ATTRIBUTE_QUERY_TEMPLATE} {PART_NUMBER_QUERY_TEMPLATE}" # As llm_interface.pdf_retrieval_query
+    attribute_queries = embeddings.embed_documents([query_template.format(attribute_key=key, part_number="N/A") for key in ATTRIBUTE_KEYWORDS])
+    rng = np.random.default_rng(seed)
+    sampled = vectors[rng.choice(len(vectors), min(samples, len(vectors)), replace=False)]
+    return np.concatenate([np.asarray(attribute_queries, dtype=np.float32), sampled])
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process plus its finished children (e.g. the PDF pool), in MB."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024 # ru_maxrss is bytes on macOS, KB on Linux
+    return (own + children) / scale
+
+def run_metadata() -> dict:
+    """Where and on what code a result was produced."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=False).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def write_results(results: dict, output: str):
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+def compare_results(current: dict, baseline_path: str, metrics: List[str]):
+    """Prints each metric next to the value stored in an earlier results file."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nComparison with {baseline_path} ({baseline.get('meta', {}).get('git_commit', '?')}):")
+    for metric in metrics:
+        old, new = baseline.get("metrics", {}).get(metric), current["metrics"].get(metric)
+        if not old or new is None:
+            continue
+        print(f"  {metric:<24} {old:>12.2f} -> {new:>12.2f}  ({(new - old) / old * 100:+.1f}%)")
@@ -0,0 +1,169 @@
+# benchmarks/synthetic_datasheets.py
+"""
+Generates synthetic connector datasheet PDFs for the benchmarks: a prose overview,
+ruled spec tables, multi-page dimension drawings and boilerplate (legal notice,
+revision history, ordering/packaging). Output is deterministic for a given seed.
+
+Usage:
+    python benchmarks/synthetic_datasheets.py --files 20 --out ./synthetic_pdfs
+"""
+import argparse
+import io
+import os
+import random
+from typing import List
+
+import fitz # PyMuPDF
+
+MATERIALS = ["PA66", "PA6", "PBT", "PPS", "LCP", "PA66-GF30", "PBT-GF20", "PPA-GF35"]
+COLOURS = ["black", "natural", "grey", "blue", "orange", "green"]
+GENDERS = ["female", "male"]
+CONNECTOR_TYPES = ["Plug", "Receptacle", "Header", "Inline connector"]
+SEALINGS = ["sealed", "unsealed"]
+SEALING_CLASSES = ["IP67", "IP6K9K", "IPx7", "IP69K"]
+CONTACT_SYSTEMS = ["MQS 0.64", "MLK 1.2", "HPT 2.8", "NanoMQS", "MCP 1.5K"]
+PDF_DATE = "D:20240101000000Z" # Fixed creation/modification date: identical bytes (and file hashes) on every run
+
+BOILERPLATE = [
+    ("Legal Notice", "All rights reserved. This document is provided for information only and is subject to change "
+                     "without notice. No liability is accepted for errors or omissions. Copyright and trademark "
+                     "rights remain with their respective owners. Confidential. "),
+    ("Revision History", "Rev A initial release. Rev B editorial changes. Rev C updated drawing references. "
+                         "Rev D document template changed. Change history maintained by documentation control. "),
+    ("Ordering Information and Packaging", "Ordering information: contact your local sales office. Packaging: bag, "
+                                           "box, reel. Minimum order quantity applies. Contact us for delivery terms "
+                                           "and conditions. Terms and conditions of sale apply. "),
+]
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842 # A4 in points
+MARGIN = 50
+
+class NamedBytesIO(io.BytesIO):
+    """In-memory upload with a .name, mimicking Streamlit's UploadedFile."""
+
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+def _spec_rows(rng: random.Random, part_number: str) -> List[List[str]]:
+    height, width, length = (round(rng.uniform(5, 60), 1) for _ in range(3))
+    t_min, t_max = rng.choice([-40, -30, -55]), rng.choice([85, 105, 125, 150])
+    return [
+        ["Property", "Value"],
+        ["Part number", part_number],
+        ["Material", rng.choice(MATERIALS)],
+        ["Colour", rng.choice(COLOURS)],
+        ["Gender", rng.choice(GENDERS)],
+        ["Type of connector", rng.choice(CONNECTOR_TYPES)],
+        ["Number of cavities", str(rng.choice([2, 3, 4, 6, 8, 12, 16, 24]))],
+        ["Number of rows", str(rng.choice([1, 2, 3]))],
+        ["Height [mm]", f"{height}"],
+        ["Width [mm]", f"{width}"],
+        ["Length [mm]", f"{length}"],
+        ["Working temperature", f"{t_min} °C to +{t_max} °C"],
+        ["Sealing", rng.choice(SEALINGS)],
+        ["Sealing class", rng.choice(SEALING_CLASSES)],
+        ["Contact system", rng.choice(CONTACT_SYSTEMS)],
+        ["Terminal position assurance", rng.choice(["yes", "no"])],
+        ["Connector position assurance", rng.choice(["yes", "no"])],
+        ["HV qualified", rng.choice(["yes", "no"])],
+    ]
+
+def _draw_table(page, rows: List[List[str]], top: float, col_widths: List[float], row_height: float = 18) -> float:
+    """Draws a ruled table (so PyMuPDF's table finder detects it); returns the y below it."""
+    x0 = MARGIN
+    x1 = x0 + sum(col_widths)
+    for r, row in enumerate(rows):
+        y = top + r * row_height
+        page.draw_line((x0, y), (x1, y))
+        x = x0
+        for c, cell in enumerate(row):
+            page.insert_text((x + 4, y + row_height - 5), cell, fontsize=9)
+            x += col_widths[c]
+    bottom = top + len(rows) * row_height
+    page.draw_line((x0, bottom), (x1, bottom))
+    x = x0
+    for width in [0] + col_widths:
+        x += width
+        page.draw_line((x, top), (x, bottom))
+    return bottom
+
+def _write_paragraph(page, text: str, top: float, height: float = 200, fontsize: float = 10):
+    page.insert_textbox(fitz.Rect(MARGIN, top, PAGE_WIDTH - MARGIN, top + height), text, fontsize=fontsize)
+
+def _overview_text(rng: random.Random, part_number: str, rows: List[List[str]]) -> str:
+    specs = {name: value for name, value in rows[1:]}
+    sentences = [
+        f"The {part_number} is a {specs['Number of cavities']}-way {specs['Gender']} {specs['Type of connector'].lower()} "
+        f"housing made of {specs['Material']} in {specs['Colour']}.",
+        f"It is designed for the {specs['Contact system']} contact system and is {specs['Sealing']} to {specs['Sealing class']}.",
+        f"The operating temperature range is {specs['Working temperature']}.",
+        "The housing provides a primary latch and optional secondary locking for terminal position assurance.",
+        "Mechanical coding prevents mis-mating with similar connectors in the same harness.",
+    ]
+    rng.shuffle(sentences)
+    return " ".join(sentences * 3)
+
+def make_datasheet(part_number: str, spec_pages: int = 1, drawing_pages: int = 2,
+                   boilerplate_pages: int = 2, seed: int = 0) -> bytes:
+    """Builds one synthetic datasheet and returns the PDF bytes."""
+    rng = random.Random(f"{seed}-{part_number}")
+    doc = fitz.open()
+
+    for spec_page in range(max(spec_pages, 1)):
+        rows = _spec_rows(rng, part_number)
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_text((MARGIN, MARGIN + 10), f"Product Datasheet {part_number}", fontsize=16)
+        _write_paragraph(page, _overview_text(rng, part_number, rows), MARGIN + 30, height=180)
+        page.insert_text((MARGIN, MARGIN + 230), "Technical Data", fontsize=12)
+        _draw_table(page, rows, MARGIN + 240, [220, 240])
+
+    for sheet in range(drawing_pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_text((MARGIN, MARGIN + 10), f"Drawing {part_number} sheet {sheet + 1}/{drawing_pages}", fontsize=12)
+        for _ in range(rng.randint(8, 16)):
+            x0, y0 = rng.uniform(MARGIN, 400), rng.uniform(120, 650)
+            rect = fitz.Rect(x0, y0, x0 + rng.uniform(30, 140), y0 + rng.uniform(20, 120))
+            page.draw_rect(rect)
+            page.insert_text((rect.x0, rect.y1 + 12), f"{rng.uniform(0.5, 60):.2f} mm", fontsize=7)
+        page.insert_text((MARGIN, PAGE_HEIGHT - MARGIN), "General tolerances ISO 2768-m. Dimensions in mm.", fontsize=8)
+
+    for i in range(boilerplate_pages):
+        title, text = BOILERPLATE[i % len(BOILERPLATE)]
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_text((MARGIN, MARGIN + 10), title, fontsize=14)
+        _write_paragraph(page, text * 8, MARGIN + 30, height=500)
+
+    doc.set_metadata({"title": f"Product Datasheet {part_number}", "creationDate": PDF_DATE, "modDate": PDF_DATE})
+    data = doc.tobytes(no_new_id=True)
+    doc.close()
+    return data
+
+def make_corpus(files: int, spec_pages: int = 1, drawing_pages: int = 2,
+                boilerplate_pages: int = 2, seed: int = 0) -> List[NamedBytesIO]:
+    """Builds a list of in-memory uploads, one synthetic datasheet each."""
+    uploads = []
+    for i in range(files):
+        part_number = f"SYN-{seed:02d}{i:05d}"
+        data = make_datasheet(part_number, spec_pages, drawing_pages, boilerplate_pages, seed)
+        uploads.append(NamedBytesIO(data, f"{part_number}.pdf"))
+    return uploads
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic connector datasheet PDFs.")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--spec-pages", type=int, default=1)
+    parser.add_argument("--drawing-pages", type=int, default=2)
+    parser.add_argument("--boilerplate-pages", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="synthetic_pdfs")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for upload in make_corpus(args.files, args.spec_pages, args.drawing_pages, args.boilerplate_pages, args.seed):
+        with open(os.path.join(args.out, upload.name), "wb") as f:
+            f.write(upload.getvalue())
+    print(f"Wrote {args.files} PDF(s) to {args.out}")
+
+if __name__ == "__main__":
+    main()
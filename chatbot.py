@@ -12,6 +12,7 @@ import contextlib
 from supabase import create_client, Client
 from sentence_transformers import SentenceTransformer
 from groq import Groq
+from embedding_cache import get_embedding_cache
 
 # --- Configuration ---
 try:
@@ -125,7 +126,16 @@ def get_query_embedding(text):
     if not text:
         return None
     try:
-        return st_model.encode(text).tolist()
+        # Repeated questions are served from the shared on-disk cache (st_model does not normalise)
+        cache = get_embedding_cache()
+        if cache is not None:
+            cached = cache.get(EMBEDDING_MODEL_NAME, False, text)
+            if cached is not None:
+                return cached
+        embedding = st_model.encode(text).tolist()
+        if cache is not None:
+            cache.put(EMBEDDING_MODEL_NAME, False, text, embedding)
+        return embedding
     except Exception as e:
         st.error(f"    Error generating query embedding: {e}")
         return None
@@ -0,0 +1,162 @@
+# collection_registry.py
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+import config # Import configuration
+
+try:
+    import fcntl # POSIX only; elsewhere the registry relies on atomic renames alone
+except ImportError:
+    fcntl = None
+
+_TOUCH_INTERVAL_SECONDS = 60 # last_used is rewritten at most this often per collection
+
+def new_collection_name(scope: str = None) -> str:
+    """
+    Collection name for a new session or job per config.COLLECTION_SCOPE: "global" is
+    the shared config.COLLECTION_NAME, "session"/"job" add a random suffix. Names stay
+    within Chroma's rules (3-63 chars of [a-zA-Z0-9._-], alphanumeric at both ends).
+    """
+    scope = scope or config.COLLECTION_SCOPE
+    if scope == "global":
+        return config.COLLECTION_NAME
+    base = re.sub(r"[^a-zA-Z0-9._-]", "-", config.COLLECTION_NAME)[:48].strip("._-") or "collection"
+    return f"{base}-{scope[0]}{uuid.uuid4().hex[:12]}"
+
+class CollectionRegistry:
+    """
+    Tracks the namespaced collections of one persistence directory in
+    <dir>/collections.json (name -> created, last_used, backend) so expired ones can be
+    garbage-collected. Reads and writes take an advisory file lock, so several app
+    processes can share the directory. Without a persistence directory (in-memory
+    store) the registry is empty and never written.
+    """
+
+    def __init__(self, directory: str = None):
+        if directory is None:
+            from vector_store import vector_store_directory
+            directory = vector_store_directory()
+        self.directory = directory
+        self.path = os.path.join(self.directory, "collections.json") if self.directory else None
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path + ".lock", "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> Dict[str, dict]:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, entries: Dict[str, dict]):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=1)
+        os.replace(temp_path, self.path)
+
+    def entries(self) -> Dict[str, dict]:
+        if not self.directory:
+            return {}
+        with self._locked():
+            return self._read()
+
+    def contains(self, name: str) -> bool:
+        return name in self.entries()
+
+    def touch(self, name: str, modified: bool = False):
+        """
+        Registers the collection, or refreshes its last-used time (throttled). modified=True
+        records a write: it bumps the collection's version, which invalidates cached retrievals.
+        """
+        if not self.directory:
+            return
+        now = time.time()
+        with self._locked():
+            entries = self._read()
+            entry = entries.get(name)
+            if entry and not modified and now - entry["last_used"] < _TOUCH_INTERVAL_SECONDS:
+                return
+            version = (entry or {}).get("version", 0)
+            entries[name] = {
+                "created": entry["created"] if entry else now,
+                "last_used": now,
+                "backend": config.VECTOR_STORE_BACKEND,
+                "version": version + 1 if modified else version,
+            }
+            self._write(entries)
+
+    def version(self, name: str) -> Optional[int]:
+        """Write version of a collection, or None if unregistered. Reads without the lock (writes are atomic renames)."""
+        entry = self._read().get(name)
+        return entry.get("version", 0) if entry else None
+
+    def expired(self, ttl_seconds: float = None) -> List[str]:
+        ttl_seconds = config.COLLECTION_TTL_HOURS * 3600 if ttl_seconds is None else ttl_seconds
+        cutoff = time.time() - ttl_seconds
+        return [name for name, entry in self.entries().items()
+                if entry["last_used"] < cutoff and name != config.COLLECTION_NAME]
+
+    def collect_garbage(self, ttl_seconds: float = None) -> List[str]:
+        """Deletes collections unused for longer than the TTL (never the global one); returns their names."""
+        ttl_seconds = config.COLLECTION_TTL_HOURS * 3600 if ttl_seconds is None else ttl_seconds
+        removed = []
+        for name in self.expired(ttl_seconds):
+            with self._locked():
+                entries = self._read()
+                entry = entries.get(name)
+                if not entry or entry["last_used"] >= time.time() - ttl_seconds:
+                    continue # Used again in the meantime
+                try:
+                    _delete_collection(name, entry.get("backend", config.VECTOR_STORE_BACKEND), self.directory)
+                except Exception as e:
+                    logger.warning(f"Could not delete expired collection '{name}': {e}")
+                    continue
+                entries.pop(name)
+                self._write(entries)
+            removed.append(name)
+        if removed:
+            logger.info(f"Garbage-collected {len(removed)} expired collection(s): {', '.join(removed)}")
+        return removed
+
+def _delete_collection(name: str, backend: str, directory: str):
+    if backend == "numpy":
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        return
+    from langchain_community.vectorstores import Chroma
+    Chroma(collection_name=name, persist_directory=directory).delete_collection()
+
+_last_gc = 0.0
+
+def maybe_collect_garbage(registry: Optional[CollectionRegistry] = None) -> List[str]:
+    """
+    Runs CollectionRegistry.collect_garbage at most every COLLECTION_GC_INTERVAL_MINUTES in
+    this process; skipped for COLLECTION_SCOPE="global" and without a persistence directory.
+    """
+    global _last_gc
+    if config.COLLECTION_SCOPE == "global" or time.time() - _last_gc < config.COLLECTION_GC_INTERVAL_MINUTES * 60:
+        return []
+    registry = registry or CollectionRegistry()
+    if not registry.directory:
+        return []
+    _last_gc = time.time()
+    return registry.collect_garbage()
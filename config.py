@@ -20,22 +20,88 @@ LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "qwen-qwq-32b") # Reverted to a kno
 EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
 EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu") # Add this line ('cpu' is default, 'cuda' if GPU available and configured)
 NORMALIZE_EMBEDDINGS = True # Add this line (Often recommended for sentence transformers)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface") # "huggingface" (LangChain wrapper), "batched" (embedding_engine.BatchedEmbeddings) or "onnx" (ONNX Runtime, no torch)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64)) # Texts per encode batch for the "batched" backend
+EMBEDDING_PROCESSES = int(os.getenv("EMBEDDING_PROCESSES", 1)) # >1 starts a SentenceTransformers multi-process pool (CPU hosts)
+EMBEDDING_MULTIPROCESS_MIN_TEXTS = int(os.getenv("EMBEDDING_MULTIPROCESS_MIN_TEXTS", 256)) # Smaller requests stay in-process
+ONNX_MODEL_FILE = os.getenv("ONNX_MODEL_FILE", "onnx/model.onnx") # ONNX export inside the model's Hugging Face repo
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "") # Optional local .onnx file instead of ONNX_MODEL_FILE
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "true").lower() == "true" # Dynamic int8 quantization of the ONNX model
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "./onnx_models") # Where the quantized model is written once
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", 0)) # Intra-op threads; 0 = CPUs available to this process
+ONNX_MAX_LENGTH = int(os.getenv("ONNX_MAX_LENGTH", 256)) # Token limit, as the model's max_seq_length
 # EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache") # Optional: Specify cache dir
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true" # Persistent per-text vector cache (SQLite)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.sqlite3") # Keyed by model name + normalisation + text SHA-256
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 100000)) # Least recently used vectors are evicted beyond this
 
 # --- Vector Store Configuration ---
 # Define the persistence directory (can be None for in-memory)
 CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db_prod") # Use consistent variable name
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "pdf_qa_prod_collection") # Use the name expected by vector_store.py
+# HNSW index of new Chroma collections; all four, search_ef included, are fixed at creation (existing collections keep theirs)
+CHROMA_HNSW_SPACE = os.getenv("CHROMA_HNSW_SPACE", "cosine") # "cosine", "l2" or "ip"; cosine matches NORMALIZE_EMBEDDINGS
+CHROMA_HNSW_M = int(os.getenv("CHROMA_HNSW_M", 16)) # Graph links per node: higher = better recall, more memory and build time
+CHROMA_HNSW_CONSTRUCTION_EF = int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", 100)) # Candidate list while building: higher = better graph, slower build
+CHROMA_HNSW_SEARCH_EF = int(os.getenv("CHROMA_HNSW_SEARCH_EF", 10)) # Candidate list per query: higher = better recall, slower queries
+VECTOR_STORE_UPDATE_MODE = os.getenv("VECTOR_STORE_UPDATE_MODE", "incremental") # "incremental" = upsert new chunks, delete outdated chunks of the uploaded PDFs; "append" = never delete
+INGESTION_SERVICE_ENABLED = os.getenv("INGESTION_SERVICE_ENABLED", "true").lower() == "true" # Route all index writes through one background writer thread
+INGESTION_SERVICE_MAX_BATCH = int(os.getenv("INGESTION_SERVICE_MAX_BATCH", 32)) # Queued write jobs coalesced into one write + persist per collection
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma") # "chroma" or "numpy" (numpy_store: memory-mapped .npy, exact search)
+NUMPY_STORE_DIRECTORY = os.getenv("NUMPY_STORE_DIRECTORY", "./numpy_store") # One sub-directory per collection
+NUMPY_STORE_DTYPE = os.getenv("NUMPY_STORE_DTYPE", "float16") # "float16" halves the file size; "float32" for exact scores
+NUMPY_STORE_QUANTIZATION = os.getenv("NUMPY_STORE_QUANTIZATION", "none") # "int8" or "binary": search in-memory codes, rescore a shortlist from the full vectors
+NUMPY_STORE_RESCORE_FACTOR = int(os.getenv("NUMPY_STORE_RESCORE_FACTOR", 4)) # Shortlist = k x this many candidates from the quantized codes
+NUMPY_STORE_DIMENSIONS = int(os.getenv("NUMPY_STORE_DIMENSIONS", 0)) # Keep only the first N dimensions of each vector (0 = all)
+COLLECTION_SCOPE = os.getenv("COLLECTION_SCOPE", "global") # "global" = shared COLLECTION_NAME, "session" / "job" = private collection per browser session / per processing run
+COLLECTION_TTL_HOURS = float(os.getenv("COLLECTION_TTL_HOURS", 24)) # Namespaced collections unused for this long are deleted
+COLLECTION_GC_INTERVAL_MINUTES = float(os.getenv("COLLECTION_GC_INTERVAL_MINUTES", 30)) # How often a process looks for expired collections
 
 # *** Calculate the is_persistent flag ***
-is_persistent = bool(CHROMA_PERSIST_DIRECTORY) # True if directory is set, False otherwise
+is_persistent = bool(NUMPY_STORE_DIRECTORY if VECTOR_STORE_BACKEND == "numpy" else CHROMA_PERSIST_DIRECTORY) # True if directory is set, False otherwise
 
 # --- Text Splitting Configuration ---
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", (5000)))  # Restored
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 75))  # Restored
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "page") # "page" = split each page by characters, "document" = token-aware split across pages, "sentence_window" = small-to-big (see below)
+SENTENCE_WINDOW_CHARS = int(os.getenv("SENTENCE_WINDOW_CHARS", 300)) # Max characters per indexed window ("sentence_window" strategy)
+EXPANSION_HIT_CHARS = int(os.getenv("EXPANSION_HIT_CHARS", 1500)) # Per retrieved window: its whole page if it fits, else neighbouring windows up to this size
+EXPANSION_CONTEXT_CHARS = int(os.getenv("EXPANSION_CONTEXT_CHARS", 6000)) # Total characters of expanded prose context per extraction
+CHUNK_SIZE_TOKENS = int(os.getenv("CHUNK_SIZE_TOKENS", 1000)) # Used by the "document" strategy
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 50)) # Used by the "document" strategy
+TIKTOKEN_ENCODING = os.getenv("TIKTOKEN_ENCODING", "cl100k_base") # Tokenizer used to measure chunk length
+EXTRACT_TABLES = os.getenv("EXTRACT_TABLES", "true").lower() == "true" # Store detected spec tables as compact key/value chunks
+PAGE_FILTER_MODE = os.getenv("PAGE_FILTER_MODE", "off") # "off", "skip" (drop low-relevance pages) or "tier" (one truncated chunk per low page)
+PAGE_FILTER_MIN_SCORE = float(os.getenv("PAGE_FILTER_MIN_SCORE", 4.0)) # Technical keyword/number density below which a page is filtered
+PAGE_FILTER_TIER_CHARS = int(os.getenv("PAGE_FILTER_TIER_CHARS", 1000)) # Characters kept from a down-tiered page
+
+# --- PDF Ingestion Configuration ---
+PDF_INGEST_WORKERS = int(os.getenv("PDF_INGEST_WORKERS", 1)) # 1 = serial, >1 = process pool size, 0 = one worker per CPU
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 20)) # Large PDFs are split into page ranges of this size for the pool
+PDF_MMAP_THRESHOLD_MB = int(os.getenv("PDF_MMAP_THRESHOLD_MB", 100)) # Non-buffered streams above this size are spooled to disk and memory-mapped
+STREAMING_INGESTION = os.getenv("STREAMING_INGESTION", "false").lower() == "true" # Overlap parsing with embedding/indexing
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 64)) # Chunks embedded and written per batch when streaming
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 4)) # Max batches buffered between parser and embedder (bounds peak memory)
+INGESTION_CACHE_ENABLED = os.getenv("INGESTION_CACHE_ENABLED", "true").lower() == "true" # Reuse chunks/vectors of previously seen PDFs
+INGESTION_CACHE_DIR = os.getenv("INGESTION_CACHE_DIR", "./ingestion_cache") # Keyed by PDF SHA-256 + chunking/embedding config
 
 # --- Retriever Configuration ---
 RETRIEVER_K = int(os.getenv("RETRIEVER_K", 4)) # Renamed from RETRIEVER_SEARCH_K
+TABLE_CONTEXT_TEXT_K = int(os.getenv("TABLE_CONTEXT_TEXT_K", 1)) # Prose chunks kept alongside retrieved table records
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid") # "hybrid" = BM25 + vector with rank fusion (hybrid_retriever), "vector" = vector only
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", 20)) # Candidates taken from each of the dense and sparse rankings before fusion
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", 60)) # Reciprocal rank fusion constant
+BM25_K1 = float(os.getenv("BM25_K1", 1.5))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true" # Reuse chain retrievals until the collection changes
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", 2048)) # LRU entries (collection, version, query, k, filter)
+QUERY_EMBEDDINGS_ENABLED = os.getenv("QUERY_EMBEDDINGS_ENABLED", "false").lower() == "true" # Opt-in: precomputed attribute query vectors (keyword-averaged, so retrieval differs from the plain query); embed only the part number per extraction
+QUERY_EMBEDDINGS_PATH = os.getenv("QUERY_EMBEDDINGS_PATH", "./query_embeddings.npz") # Persisted template + keyword vectors (per embedding model)
+QUERY_TEMPLATE_WEIGHT = float(os.getenv("QUERY_TEMPLATE_WEIGHT", 0.6)) # Weight of the attribute's query template vector
+QUERY_KEYWORD_WEIGHT = float(os.getenv("QUERY_KEYWORD_WEIGHT", 0.25)) # Weight of the mean keyword-expansion vector
+QUERY_PART_NUMBER_WEIGHT = float(os.getenv("QUERY_PART_NUMBER_WEIGHT", 0.35)) # Weight of the "for part number ..." vector
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "") # Prebuilt index (.npz) imported into the collection it was exported from when that collection is empty
+SNAPSHOT_DTYPE = os.getenv("SNAPSHOT_DTYPE", "float32") # Vector dtype of exported snapshots ("float16" halves the file)
 
 # --- LLM Request Configuration ---
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", 0.1)) # Adjusted default
@@ -0,0 +1,97 @@
+# context_expansion.py
+from typing import Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+from langchain.docstore.document import Document
+
+import config # Import configuration
+
+_PageKey = Tuple[Optional[str], object] # (source_hash, page)
+
+def _page_windows(vector_store, key: _PageKey) -> List[Tuple[int, str]]:
+    """All indexed prose windows of one page as (start_index, text), in page order."""
+    source_hash, page = key
+    stored = vector_store._collection.get(
+        where={"$and": [{"source_hash": source_hash}, {"page": page}, {"content_type": "text"}]},
+        include=["documents", "metadatas"],
+    )
+    windows = {
+        (metadata.get("start_index", -1), text)
+        for text, metadata in zip(stored["documents"], stored["metadatas"])
+        if text
+    }
+    return sorted(windows)
+
+def _window_span(windows: List[Tuple[int, str]], hit: int, budget: int) -> Tuple[int, int]:
+    """
+    Inclusive window range around windows[hit]: the whole page when it fits the budget,
+    otherwise neighbours added alternately after and before the hit while they fit.
+    """
+    if sum(len(text) + 1 for _, text in windows) - 1 <= budget:
+        return 0, len(windows) - 1
+    low = high = hit
+    size = len(windows[hit][1])
+    while True:
+        grown = False
+        for candidate in (high + 1, low - 1):
+            if 0 <= candidate < len(windows) and size + len(windows[candidate][1]) + 1 <= budget:
+                size += len(windows[candidate][1]) + 1
+                low, high = min(low, candidate), max(high, candidate)
+                grown = True
+        if not grown:
+            return low, high
+
+def expand_to_context(vector_store, docs: List[Document], hit_chars: int = None, total_chars: int = None) -> List[Document]:
+    """
+    Small-to-big expansion of retrieved sentence windows (CHUNKING_STRATEGY="sentence_window"):
+    each hit becomes its parent page when the page fits hit_chars, otherwise the hit
+    plus neighbouring windows up to hit_chars. Hits already covered by an earlier
+    expansion are dropped, and expanded prose stops at total_chars (the first hit is
+    always kept). Table records and chunks of other strategies pass through unchanged.
+    """
+    if config.CHUNKING_STRATEGY != "sentence_window" or not docs:
+        return docs
+    hit_chars = hit_chars or config.EXPANSION_HIT_CHARS
+    total_chars = total_chars or config.EXPANSION_CONTEXT_CHARS
+
+    pages: Dict[_PageKey, List[Tuple[int, str]]] = {}
+    covered: Dict[_PageKey, Set[int]] = {}
+    expanded, used = [], 0
+    for doc in docs:
+        metadata = doc.metadata
+        if metadata.get("content_type", "text") != "text":
+            expanded.append(doc)
+            continue
+        key = (metadata.get("source_hash"), metadata.get("page"))
+        if key[0] is None:
+            pages[key] = [] # Not from the PDF pipeline; nothing to expand against
+        elif key not in pages:
+            try:
+                pages[key] = _page_windows(vector_store, key)
+            except Exception as e:
+                logger.warning(f"Could not load the windows of page {key[1]} for context expansion: {e}")
+                pages[key] = []
+        windows = pages[key]
+        position = next((i for i, (start, text) in enumerate(windows)
+                         if start == metadata.get("start_index", -1) and text == doc.page_content), None)
+        page_covered = covered.setdefault(key, set())
+        if position is None:
+            text, start_index, span = doc.page_content, metadata.get("start_index"), set()
+        else:
+            if position in page_covered:
+                continue # Already part of an earlier hit's context
+            low, high = _window_span(windows, position, min(hit_chars, max(total_chars - used, len(doc.page_content))))
+            span = {i for i in range(low, high + 1) if i not in page_covered}
+            text = " ".join(windows[i][1] for i in sorted(span))
+            start_index = windows[min(span)][0]
+        if used and used + len(text) > total_chars:
+            continue # Over budget; later table records still pass through
+        page_covered.update(span)
+        used += len(text)
+        expanded.append(Document(page_content=text, metadata={
+            **metadata,
+            "start_index": start_index,
+            "expansion": "page" if position is not None and len(span) == len(windows) else "window",
+        }))
+    logger.debug(f"Expanded {len(docs)} retrieved chunk(s) into {len(expanded)} context block(s), {used} characters of prose")
+    return expanded
@@ -0,0 +1,134 @@
+# embedding_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+from langchain_core.embeddings import Embeddings
+
+import config # Import configuration
+
+def embedding_key(model_name: str, normalize: bool, text: str) -> str:
+    """Cache key of one text: model, normalisation flag and SHA-256 of the text."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model_name}|{int(bool(normalize))}|{digest}"
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache in SQLite. Vectors are stored as float32 blobs with a
+    last-used timestamp; once more than max_entries are stored, the least recently
+    used ones are evicted. Safe to share between threads (Streamlit sessions).
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None):
+        self.path = path or config.EMBEDDING_CACHE_PATH
+        self.max_entries = max_entries or config.EMBEDDING_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Returns the cached vectors for the keys found, and marks them as recently used."""
+        found = {}
+        with self._lock:
+            for batch_start in range(0, len(keys), 500): # Stay below SQLite's variable limit
+                batch = keys[batch_start:batch_start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch)
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """Stores vectors, evicting the least recently used entries beyond max_entries."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows)
+            self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            overflow = self._count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (overflow,)
+                )
+                self._count -= overflow
+                logger.debug(f"Embedding cache evicted {overflow} least recently used entries")
+            self._conn.commit()
+
+    def get(self, model_name: str, normalize: bool, text: str) -> Optional[List[float]]:
+        key = embedding_key(model_name, normalize, text)
+        return self.get_many([key]).get(key)
+
+    def put(self, model_name: str, normalize: bool, text: str, vector: List[float]):
+        self.put_many({embedding_key(model_name, normalize, text): vector})
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": self._count}
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache instance, or None if disabled in config."""
+    global _shared_cache
+    if not config.EMBEDDING_CACHE_ENABLED:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache()
+            logger.info(f"Embedding cache at '{_shared_cache.path}' ({_shared_cache._count} entries, cap {_shared_cache.max_entries})")
+    return _shared_cache
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an embedding function so repeated texts and queries are served from the EmbeddingCache."""
+
+    def __init__(self, inner: Embeddings, cache: EmbeddingCache, model_name: str = None, normalize: bool = None):
+        self.inner = inner
+        self.cache = cache
+        self.model_name = model_name or config.EMBEDDING_MODEL_NAME
+        self.normalize = config.NORMALIZE_EMBEDDINGS if normalize is None else normalize
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [embedding_key(self.model_name, self.normalize, text) for text in texts]
+        found = self.cache.get_many(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.inner.embed_documents(list(missing.values()))
+            new_items = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(new_items)
+            found.update(new_items)
+        logger.debug(f"Embedding cache: {len(texts) - len(missing)} of {len(texts)} texts served from cache")
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = embedding_key(self.model_name, self.normalize, text)
+        vector = self.cache.get_many([key]).get(key)
+        if vector is None:
+            vector = self.inner.embed_query(text)
+            self.cache.put_many({key: vector})
+        return vector
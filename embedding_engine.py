@@ -0,0 +1,225 @@
+# embedding_engine.py
+import atexit
+import os
+import time
+from typing import List, Optional
+
+from loguru import logger
+from langchain_core.embeddings import Embeddings
+
+import config # Import configuration
+
+class BatchedEmbeddings(Embeddings):
+    """
+    SentenceTransformer embeddings with explicit batching. Texts are sorted by length
+    so each batch pads to similar lengths, encoded batch by batch with throughput
+    logged per batch, and returned in the original order. With processes > 1, large
+    requests go through a SentenceTransformers multi-process pool (CPU-only hosts).
+    """
+
+    def __init__(
+        self,
+        model_name: str = None,
+        device: str = None,
+        normalize_embeddings: bool = None,
+        batch_size: int = None,
+        processes: int = None,
+        multiprocess_min_texts: int = None,
+    ):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name or config.EMBEDDING_MODEL_NAME
+        self.device = device or config.EMBEDDING_DEVICE
+        self.normalize_embeddings = config.NORMALIZE_EMBEDDINGS if normalize_embeddings is None else normalize_embeddings
+        self.batch_size = batch_size or config.EMBEDDING_BATCH_SIZE
+        self.processes = processes or config.EMBEDDING_PROCESSES
+        self.multiprocess_min_texts = multiprocess_min_texts or config.EMBEDDING_MULTIPROCESS_MIN_TEXTS
+        self.model = SentenceTransformer(self.model_name, device=self.device)
+        self._pool = None
+        self.last_throughput = None # Texts/sec of the most recent embed_documents call
+
+    def _get_pool(self):
+        if self._pool is None:
+            logger.info(f"Starting SentenceTransformers pool with {self.processes} CPU process(es)")
+            self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+            atexit.register(self.close)
+        return self._pool
+
+    def close(self):
+        """Stops the multi-process pool, if one was started."""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def _encode(self, texts: List[str]):
+        return self.model.encode(
+            texts,
+            batch_size=len(texts),
+            normalize_embeddings=self.normalize_embeddings,
+            show_progress_bar=False,
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Longest first, so every batch holds texts of similar length and little padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        sorted_texts = [texts[i] for i in order]
+        start = time.perf_counter()
+
+        if self.processes > 1 and len(texts) >= self.multiprocess_min_texts:
+            sorted_vectors = self.model.encode_multi_process(
+                sorted_texts, self._get_pool(), batch_size=self.batch_size,
+                chunk_size=max(self.batch_size, len(texts) // (self.processes * 4) or 1),
+            )
+            if self.normalize_embeddings:
+                import numpy as np
+                sorted_vectors = sorted_vectors / np.linalg.norm(sorted_vectors, axis=1, keepdims=True).clip(min=1e-12)
+            logger.debug(f"Embedded {len(texts)} texts on {self.processes} processes")
+        else:
+            sorted_vectors = []
+            for batch_start in range(0, len(sorted_texts), self.batch_size):
+                batch = sorted_texts[batch_start:batch_start + self.batch_size]
+                batch_begin = time.perf_counter()
+                sorted_vectors.extend(self._encode(batch))
+                elapsed = time.perf_counter() - batch_begin
+                logger.debug(f"Embedding batch {batch_start // self.batch_size + 1}: {len(batch)} texts "
+                             f"(max {len(batch[0])} chars) in {elapsed:.2f}s, {len(batch) / max(elapsed, 1e-9):.1f} texts/s")
+
+        elapsed = time.perf_counter() - start
+        self.last_throughput = len(texts) / max(elapsed, 1e-9)
+        logger.info(f"Embedded {len(texts)} texts in {elapsed:.2f}s ({self.last_throughput:.1f} texts/s)")
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for position, original_index in enumerate(order):
+            vectors[original_index] = [float(x) for x in sorted_vectors[position]]
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return [float(x) for x in self._encode([text])[0]]
+
+# --- ONNX Runtime backend ---
+def embedding_model_id() -> str:
+    """Model identity used in cache keys; quantized ONNX vectors differ slightly from the PyTorch ones."""
+    if config.EMBEDDING_BACKEND == "onnx" and config.ONNX_QUANTIZE:
+        return f"{config.EMBEDDING_MODEL_NAME}@onnx-int8"
+    return config.EMBEDDING_MODEL_NAME
+
+def default_onnx_threads() -> int:
+    """CPUs this process may run on (respects container affinity), used when ONNX_THREADS is 0."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def _quantize_onnx_model(model_path: str, model_name: str) -> str:
+    """Dynamically int8-quantizes an exported model once and returns the cached file."""
+    os.makedirs(config.ONNX_MODEL_DIR, exist_ok=True)
+    quantized_path = os.path.join(config.ONNX_MODEL_DIR, f"{model_name.replace('/', '__')}-int8.onnx")
+    if not os.path.exists(quantized_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        logger.info(f"Quantizing {model_path} to int8 -> {quantized_path}")
+        temp_path = f"{quantized_path}.tmp"
+        quantize_dynamic(model_path, temp_path, weight_type=QuantType.QInt8)
+        os.replace(temp_path, quantized_path)
+    return quantized_path
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings through ONNX Runtime on CPU, without loading torch. Uses the
+    ONNX export published with the model (or ONNX_MODEL_PATH), optionally dynamically
+    quantized to int8, with mean pooling and normalisation as in SentenceTransformers.
+    """
+
+    def __init__(
+        self,
+        model_name: str = None,
+        normalize_embeddings: bool = None,
+        batch_size: int = None,
+        threads: int = None,
+        quantize: bool = None,
+        max_length: int = None,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_name = model_name or config.EMBEDDING_MODEL_NAME
+        self.normalize_embeddings = config.NORMALIZE_EMBEDDINGS if normalize_embeddings is None else normalize_embeddings
+        self.batch_size = batch_size or config.EMBEDDING_BATCH_SIZE
+        self.threads = threads or config.ONNX_THREADS or default_onnx_threads()
+        self.quantize = config.ONNX_QUANTIZE if quantize is None else quantize
+        self.max_length = max_length or config.ONNX_MAX_LENGTH
+        self.last_throughput = None
+
+        model_path = config.ONNX_MODEL_PATH or self._download(config.ONNX_MODEL_FILE)
+        if self.quantize:
+            model_path = _quantize_onnx_model(model_path, self.model_name)
+        self.model_path = model_path
+
+        self.tokenizer = Tokenizer.from_file(self._download("tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+        pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX embedding model {model_path} ({'int8' if self.quantize else 'fp32'}, {self.threads} threads)")
+
+    def _download(self, filename: str) -> str:
+        from huggingface_hub import hf_hub_download
+        return hf_hub_download(self.model_name, filename)
+
+    def _encode(self, texts: List[str]):
+        import numpy as np
+
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feed)[0]
+
+        mask = attention_mask[:, :, None].astype(np.float32)
+        vectors = (token_embeddings * mask).sum(axis=1) / mask.sum(axis=1).clip(min=1e-9)
+        if self.normalize_embeddings:
+            vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Same length-sorted batching as BatchedEmbeddings: padding is per batch
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        sorted_texts = [texts[i] for i in order]
+        start = time.perf_counter()
+        sorted_vectors = []
+        for batch_start in range(0, len(sorted_texts), self.batch_size):
+            sorted_vectors.extend(self._encode(sorted_texts[batch_start:batch_start + self.batch_size]))
+        elapsed = time.perf_counter() - start
+        self.last_throughput = len(texts) / max(elapsed, 1e-9)
+        logger.info(f"Embedded {len(texts)} texts with ONNX Runtime in {elapsed:.2f}s ({self.last_throughput:.1f} texts/s)")
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for position, original_index in enumerate(order):
+            vectors[original_index] = [float(x) for x in sorted_vectors[position]]
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return [float(x) for x in self._encode([text])[0]]
+
+def cosine_parity(reference: List[List[float]], candidate: List[List[float]]) -> dict:
+    """Per-text cosine similarity between two backends' vectors for the same texts."""
+    import numpy as np
+
+    a = np.asarray(reference, dtype=np.float32)
+    b = np.asarray(candidate, dtype=np.float32)
+    a = a / np.linalg.norm(a, axis=1, keepdims=True).clip(min=1e-12)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True).clip(min=1e-12)
+    cosines = (a * b).sum(axis=1)
+    return {"min": float(cosines.min()), "mean": float(cosines.mean()), "texts": int(len(cosines))}
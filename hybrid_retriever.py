@@ -0,0 +1,197 @@
+# hybrid_retriever.py
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from langchain.docstore.document import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+import config # Import configuration
+from numpy_store import matches_where
+
+# --- Tokenization ---
+# Keeps compound tokens such as "pa66-gf30", "0.64" or "1-1418390-1" intact
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+_COMPOUND_SPLIT_RE = re.compile(r"[\-/]")
+
+# The PDF chain's queries end in "for part number <pn>" (see llm_interface.pdf_retrieval_query)
+_PART_NUMBER_RE = re.compile(r"\bfor part number\s+(.+?)\s*$", re.IGNORECASE)
+_QUERY_FILLER_WORDS = {"extract", "information", "about"} # Template words left before the part-number tail
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased tokens; compounds are indexed whole and by their '-' / '/' separated parts."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        if "-" in token or "/" in token:
+            tokens.extend(part for part in _COMPOUND_SPLIT_RE.split(token) if part)
+    return tokens
+
+# --- Sparse Index ---
+class BM25Index:
+    """
+    In-process BM25 inverted index over the chunks of a collection. Postings are
+    numpy arrays of (document row, term frequency); a query touches only the
+    postings of its own terms.
+    """
+
+    def __init__(self, documents: List[Document], k1: float = None, b: float = None):
+        self.k1 = config.BM25_K1 if k1 is None else k1
+        self.b = config.BM25_B if b is None else b
+        self.documents = documents
+        postings: Dict[str, Dict[int, int]] = {}
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for row, doc in enumerate(documents):
+            tokens = tokenize(doc.page_content)
+            lengths[row] = len(tokens)
+            for token in tokens:
+                row_counts = postings.setdefault(token, {})
+                row_counts[row] = row_counts.get(row, 0) + 1
+        self.lengths = lengths
+        self.average_length = float(lengths.mean()) if len(lengths) else 0.0
+        self.postings = {
+            token: (np.fromiter(row_counts.keys(), dtype=np.int32, count=len(row_counts)),
+                    np.fromiter(row_counts.values(), dtype=np.float32, count=len(row_counts)))
+            for token, row_counts in postings.items()
+        }
+        logger.info(f"Built BM25 index over {len(documents)} chunks ({len(self.postings)} terms)")
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def rows_with(self, token: str) -> np.ndarray:
+        """Rows whose text contains the (whole, lower-cased) token."""
+        posting = self.postings.get(token)
+        return posting[0] if posting is not None else np.zeros(0, dtype=np.int32)
+
+    def search(self, query: str, k: int, where: Optional[dict] = None, within: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Top-k (row, BM25 score) pairs for the query terms, best first; documents without
+        any term are omitted. within, if given, restricts the candidates to those rows.
+        """
+        if not self.documents:
+            return []
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        length_norm = self.k1 * (1 - self.b + self.b * self.lengths / max(self.average_length, 1e-9))
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            rows, frequencies = posting
+            idf = math.log(1 + (len(self.documents) - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * frequencies * (self.k1 + 1) / (frequencies + length_norm[rows])
+        candidates = np.flatnonzero(scores > 0)
+        if within is not None:
+            candidates = np.intersect1d(candidates, within)
+        if where:
+            candidates = np.array([row for row in candidates if matches_where(self.documents[row].metadata, where)], dtype=np.int64)
+        if not len(candidates):
+            return []
+        top = candidates[np.argsort(-scores[candidates], kind="stable")[:k]]
+        return [(int(row), float(scores[row])) for row in top]
+
+def build_bm25_index(vector_store: VectorStore) -> BM25Index:
+    """Indexes every chunk currently stored in the vector store's collection."""
+    stored = vector_store._collection.get(include=["documents", "metadatas"])
+    documents = [
+        Document(page_content=text or "", metadata=metadata or {})
+        for text, metadata in zip(stored["documents"], stored["metadatas"])
+    ]
+    return BM25Index(documents)
+
+# --- Hybrid Retriever ---
+def _fusion_key(doc: Document) -> Tuple[Any, str]:
+    return doc.metadata.get("source"), doc.page_content
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fuses dense (vector store) and sparse (BM25) results with reciprocal rank fusion.
+    Queries naming a part number that the index holds as an exact token are answered
+    from BM25 alone, without embedding, when chunks with that token also match the
+    query's other terms (see exact_part_number_search). The BM25 index is rebuilt when the collection's registry version (bumped by every
+    committed write, see retrieval_cache.collection_version) moves past index_version.
+    Accepts the same search_kwargs as VectorStoreRetriever ("k", "filter").
+    """
+
+    vectorstore: VectorStore
+    index: Optional[BM25Index] = None # Built on first use, see current_index
+    index_version: Optional[Tuple[str, int]] = None # Collection version the index was built from
+    search_kwargs: dict = {}
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def current_index(self) -> BM25Index:
+        """The BM25 index, (re)built first if missing or if the collection was written since it was built."""
+        from retrieval_cache import collection_version
+
+        version = collection_version(self) # Read before indexing: a write during the build triggers another rebuild
+        if self.index is None or (version is not None and version != self.index_version):
+            if self.index is not None:
+                logger.info(f"Collection '{version[0]}' changed (version {version[1]}); rebuilding the BM25 index")
+            self.index = build_bm25_index(self.vectorstore)
+            self.index_version = version
+        return self.index
+
+    def exact_part_number_search(self, query: str, k: int, where: Optional[dict] = None) -> Optional[List[Document]]:
+        """
+        Sparse-only answer for a query ending in "for part number <pn>": the top-k chunks
+        (BM25 over the query's other terms) among those containing every token of the part
+        number whole and at least one of the other terms. None if the part number is not
+        indexed exactly or no such chunk passes the filter; the query then goes hybrid.
+        """
+        match = _PART_NUMBER_RE.search(query)
+        if not match:
+            return None
+        part_tokens = _TOKEN_RE.findall(match.group(1).lower())
+        if not part_tokens or not any(ch.isdigit() for ch in match.group(1)): # "N/A" or no part number
+            return None
+        index = self.current_index()
+        rows = None
+        for token in part_tokens:
+            token_rows = index.rows_with(token)
+            rows = token_rows if rows is None else np.intersect1d(rows, token_rows)
+        if not len(rows):
+            return None
+        terms = " ".join(token for token in tokenize(query[:match.start()]) if token not in _QUERY_FILLER_WORDS)
+        hits = index.search(terms, k, where, rows) if terms else index.search(" ".join(part_tokens), k, where, rows)
+        if not hits:
+            return None
+        logger.debug(f"Query '{query}' answered from the sparse index (exact part number, {len(hits)} chunk(s))")
+        return [index.documents[row] for row, _ in hits]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs) -> List[Document]:
+        search_kwargs = {**self.search_kwargs, **kwargs} # Per-call overrides, e.g. retriever.invoke(query, filter=...)
+        k = search_kwargs.get("k", config.RETRIEVER_K)
+        where = search_kwargs.get("filter")
+        exact = self.exact_part_number_search(query, k, where)
+        if exact is not None:
+            return exact
+        fetch_k = max(self.fetch_k, k)
+        dense_kwargs = {"filter": where} if where else {}
+        dense = self.vectorstore.similarity_search(query, k=fetch_k, **dense_kwargs)
+        return self._fuse(dense, self._sparse(query, fetch_k, where), k)
+
+    def _sparse(self, query: str, fetch_k: int, where: Optional[dict]) -> List[Document]:
+        index = self.current_index()
+        return [index.documents[row] for row, _ in index.search(query, fetch_k, where)]
+
+    def _fuse(self, dense: List[Document], sparse: List[Document], k: int) -> List[Document]:
+        fused: Dict[Tuple[Any, str], List] = {} # key -> [score, document]
+        for ranking in (dense, sparse):
+            for rank, doc in enumerate(ranking):
+                entry = fused.setdefault(_fusion_key(doc), [0.0, doc])
+                entry[0] += 1.0 / (self.rrf_k + rank + 1)
+        ranked = sorted(fused.values(), key=lambda entry: entry[0], reverse=True)
+        return [doc for _, doc in ranked[:k]]
+
+    def batch_search(self, queries: List[str], dense_results: List[List[Document]], k: int, where: Optional[dict] = None) -> List[List[Document]]:
+        """
+        Fuses precomputed dense results (one list per query, e.g. from one multi-query
+        vector search of fetch_k each) with per-query BM25 results.
+        """
+        fetch_k = max(self.fetch_k, k)
+        return [self._fuse(dense, self._sparse(query, fetch_k, where), k) for query, dense in zip(queries, dense_results)]
@@ -0,0 +1,157 @@
+# index_snapshot.py
+"""
+Snapshot export/import of a vector store collection: vectors, chunk text and metadata
+in one compressed .npz file, so a new replica can load a prebuilt index instead of
+re-ingesting every PDF.
+
+Usage:
+    python index_snapshot.py export snapshots/index.npz [--collection NAME]
+    python index_snapshot.py import snapshots/index.npz [--collection NAME]
+"""
+import argparse
+import json
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+from loguru import logger
+
+import config # Import configuration
+from embedding_engine import embedding_model_id
+from ingestion_cache import config_fingerprint
+
+SNAPSHOT_FORMAT = 1
+
+# --- Encoding ---
+# Text columns are stored as one UTF-8 blob plus offsets: fixed-width numpy strings
+# would pad every chunk to the longest one
+def _pack_strings(values: List[str]):
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def _unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+# --- Export ---
+def export_snapshot(vector_store, path: str) -> dict:
+    """Writes every chunk of the store's collection to path; returns the snapshot header."""
+    start_time = time.time()
+    stored = vector_store._collection.get(include=["embeddings", "documents", "metadatas"])
+    vectors = np.asarray(stored["embeddings"] if len(stored["ids"]) else np.zeros((0, 0)), dtype=config.SNAPSHOT_DTYPE)
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "embedding_model": embedding_model_id(),
+        "normalize_embeddings": config.NORMALIZE_EMBEDDINGS,
+        "dimensions": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "count": len(stored["ids"]),
+        "chunking": config_fingerprint(),
+        "collection": vector_store._collection.name,
+        "created": time.time(),
+    }
+    ids, id_offsets = _pack_strings(stored["ids"])
+    texts, text_offsets = _pack_strings([text or "" for text in stored["documents"]])
+    metadatas, metadata_offsets = _pack_strings([json.dumps(metadata or {}, ensure_ascii=False) for metadata in stored["metadatas"]])
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.tmp.npz"
+    np.savez_compressed(
+        temp_path, header=np.array(json.dumps(header)), vectors=vectors,
+        ids=ids, id_offsets=id_offsets, texts=texts, text_offsets=text_offsets,
+        metadatas=metadatas, metadata_offsets=metadata_offsets,
+    )
+    os.replace(temp_path, path)
+    logger.success(f"Exported {header['count']} chunks of '{header['collection']}' to {path} "
+                   f"({os.path.getsize(path) / 1e6:.1f} MB) in {time.time() - start_time:.2f} seconds.")
+    return header
+
+# --- Import ---
+def read_snapshot_header(path: str) -> dict:
+    with np.load(path, allow_pickle=False) as data:
+        return json.loads(str(data["header"]))
+
+def check_snapshot(header: dict, embedding_function) -> Optional[str]:
+    """Why the snapshot cannot serve this deployment's queries, or None if it can."""
+    if header.get("format") != SNAPSHOT_FORMAT:
+        return f"unsupported snapshot format {header.get('format')}"
+    if header["embedding_model"] != embedding_model_id():
+        return f"embedded with '{header['embedding_model']}', this deployment uses '{embedding_model_id()}'"
+    if bool(header["normalize_embeddings"]) != bool(config.NORMALIZE_EMBEDDINGS):
+        return "NORMALIZE_EMBEDDINGS differs from the snapshot"
+    dimensions = len(embedding_function.embed_query("dimension check"))
+    truncated = config.VECTOR_STORE_BACKEND == "numpy" and header["dimensions"] == config.NUMPY_STORE_DIMENSIONS
+    if header["count"] and header["dimensions"] != dimensions and not truncated:
+        return f"snapshot vectors have {header['dimensions']} dimensions, the embedding model {dimensions}"
+    return None
+
+def import_snapshot(path: str, embedding_function, collection_name: str = None):
+    """
+    Loads a snapshot into the collection (upserting by chunk ID) after verifying its
+    embedding model and dimension. Returns the vector store, or None if the snapshot
+    does not match this deployment.
+    """
+    from vector_store import _WRITE_BATCH_SIZE, _commit_writes, _new_write_job, open_vector_store, vector_store_directory
+
+    start_time = time.time()
+    collection_name = collection_name or config.COLLECTION_NAME
+    with np.load(path, allow_pickle=False) as data:
+        header = json.loads(str(data["header"]))
+        problem = check_snapshot(header, embedding_function)
+        if problem:
+            logger.error(f"Refusing to import snapshot {path}: {problem}")
+            return None
+        if header["chunking"] != config_fingerprint():
+            logger.warning(f"Snapshot {path} was built with different chunking settings; re-ingested PDFs will not reuse its chunks")
+        vectors = data["vectors"].astype(np.float32)
+        ids = _unpack_strings(data["ids"], data["id_offsets"])
+        texts = _unpack_strings(data["texts"], data["text_offsets"])
+        metadatas = [json.loads(value) for value in _unpack_strings(data["metadatas"], data["metadata_offsets"])]
+
+    vector_store = open_vector_store(embedding_function, collection_name)
+    job = _new_write_job(collection_name, embedding_function) # Through the single writer, if enabled
+    sink = job or vector_store._collection
+    for batch_start in range(0, len(ids), _WRITE_BATCH_SIZE):
+        batch = slice(batch_start, batch_start + _WRITE_BATCH_SIZE)
+        sink.upsert(ids=ids[batch], embeddings=vectors[batch].tolist(), documents=texts[batch], metadatas=metadatas[batch])
+    _commit_writes(vector_store, collection_name, vector_store_directory(), True, [job] if job else [])
+    logger.success(f"Imported {len(ids)} chunks from {path} into '{collection_name}' in {time.time() - start_time:.2f} seconds.")
+    return vector_store
+
+def restore_if_empty(embedding_function, collection_name: str = None) -> bool:
+    """
+    Cold start: imports config.SNAPSHOT_PATH into the collection when it is the one
+    the snapshot was exported from and is empty (e.g. a fresh replica). Per-session and
+    per-job collections are never filled. Returns True if a snapshot was imported.
+    """
+    from vector_store import open_vector_store
+
+    path = config.SNAPSHOT_PATH
+    collection_name = collection_name or config.COLLECTION_NAME
+    if not path or not os.path.exists(path):
+        return False
+    if read_snapshot_header(path).get("collection") != collection_name:
+        return False
+    if open_vector_store(embedding_function, collection_name)._collection.count() > 0:
+        return False
+    logger.info(f"Collection is empty; restoring it from snapshot {path}")
+    return import_snapshot(path, embedding_function, collection_name) is not None
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a vector store collection snapshot.")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path", help="Snapshot file (.npz)")
+    parser.add_argument("--collection", default=config.COLLECTION_NAME)
+    args = parser.parse_args()
+
+    from vector_store import get_embedding_function, open_vector_store
+    embedding_function = get_embedding_function()
+    if args.action == "export":
+        export_snapshot(open_vector_store(embedding_function, args.collection), args.path)
+    elif import_snapshot(args.path, embedding_function, args.collection) is None:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
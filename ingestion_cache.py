@@ -0,0 +1,110 @@
+# ingestion_cache.py
+import hashlib
+import json
+import os
+import shutil
+from typing import List, Optional
+
+import numpy as np
+from loguru import logger
+from langchain.docstore.document import Document
+
+import config # Import configuration
+from embedding_engine import embedding_model_id
+
+def hash_pdf_bytes(data) -> str:
+    """SHA-256 of the raw PDF content (bytes or any buffer, hashed without copying)."""
+    return hashlib.sha256(data).hexdigest()
+
+def config_fingerprint() -> str:
+    """Settings that change the chunks or their vectors; part of every cache key."""
+    settings = {
+        "chunk_format": 3, # Bump when chunk metadata changes
+        "chunk_size": config.CHUNK_SIZE,
+        "chunk_overlap": config.CHUNK_OVERLAP,
+        "chunking_strategy": config.CHUNKING_STRATEGY,
+        "sentence_window_chars": config.SENTENCE_WINDOW_CHARS if config.CHUNKING_STRATEGY == "sentence_window" else 0,
+        "chunk_size_tokens": config.CHUNK_SIZE_TOKENS,
+        "chunk_overlap_tokens": config.CHUNK_OVERLAP_TOKENS,
+        "tiktoken_encoding": config.TIKTOKEN_ENCODING,
+        "extract_tables": config.EXTRACT_TABLES,
+        "page_filter": [config.PAGE_FILTER_MODE, config.PAGE_FILTER_MIN_SCORE, config.PAGE_FILTER_TIER_CHARS],
+        "embedding_model": embedding_model_id(),
+        "normalize_embeddings": config.NORMALIZE_EMBEDDINGS,
+        "stored_dimensions": config.NUMPY_STORE_DIMENSIONS if config.VECTOR_STORE_BACKEND == "numpy" else 0, # Cached vectors come back truncated
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+class IngestionCache:
+    """
+    Content-addressed cache of processed PDFs. Each entry holds the chunks and the
+    chunk vectors of one PDF, keyed by the SHA-256 of its bytes plus the chunking and
+    embedding config, so re-uploads skip parsing, splitting and embedding entirely.
+    Layout: <cache_dir>/<pdf sha256>-<config fingerprint>/{chunks.json, vectors.npy}
+    """
+
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = cache_dir or config.INGESTION_CACHE_DIR
+        self.fingerprint = config_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_dir(self, source_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{source_hash}-{self.fingerprint}")
+
+    def contains(self, source_hash: str) -> bool:
+        entry_dir = self._entry_dir(source_hash)
+        return (os.path.exists(os.path.join(entry_dir, "chunks.json"))
+                and os.path.exists(os.path.join(entry_dir, "vectors.npy")))
+
+    def lookup(self, source_hash: str, file_basename: str) -> Optional[List[Document]]:
+        """Returns the cached chunks of a PDF (renamed to the current upload) and counts the hit/miss."""
+        if not self.contains(source_hash):
+            self.misses += 1
+            return None
+        try:
+            with open(os.path.join(self._entry_dir(source_hash), "chunks.json"), "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable ingestion cache entry for {file_basename}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info(f"Ingestion cache hit for {file_basename} ({len(records)} chunks)")
+        return [
+            Document(page_content=r["page_content"], metadata={**r["metadata"], "source": file_basename})
+            for r in records
+        ]
+
+    def load_vectors(self, source_hash: str) -> Optional[np.ndarray]:
+        """Returns the cached chunk vectors of a PDF (memory-mapped), in chunk order."""
+        try:
+            return np.load(os.path.join(self._entry_dir(source_hash), "vectors.npy"), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+    def store(self, source_hash: str, documents: List[Document], vectors: List[List[float]]):
+        """Writes one PDF's chunks and vectors. The entry only becomes visible once complete."""
+        entry_dir = self._entry_dir(source_hash)
+        tmp_dir = entry_dir + ".tmp"
+        try:
+            os.makedirs(tmp_dir, exist_ok=True)
+            with open(os.path.join(tmp_dir, "chunks.json"), "w", encoding="utf-8") as f:
+                json.dump([{"page_content": d.page_content, "metadata": d.metadata} for d in documents], f)
+            np.save(os.path.join(tmp_dir, "vectors.npy"), np.asarray(vectors, dtype=np.float32))
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+            logger.debug(f"Stored {len(documents)} chunks in ingestion cache entry {os.path.basename(entry_dir)}")
+        except (OSError, ValueError) as e: # ValueError: vectors of differing dimensions
+            logger.warning(f"Could not write ingestion cache entry {entry_dir}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+def get_ingestion_cache() -> Optional[IngestionCache]:
+    """Returns a fresh cache handle (with zeroed counters) if caching is enabled."""
+    if not config.INGESTION_CACHE_ENABLED:
+        return None
+    return IngestionCache()
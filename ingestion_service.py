@@ -0,0 +1,188 @@
+# ingestion_service.py
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+import config # Import configuration
+
+try:
+    import fcntl # POSIX only; elsewhere writes are serialised within the process only
+except ImportError:
+    fcntl = None
+
+_WAIT_HISTORY = 200 # Recent jobs kept for the wait-time statistics
+
+class WriteJob:
+    """
+    The writes of one ingestion run (or one streamed batch) against one collection.
+    Collects upsert/delete calls with the Chroma collection signatures, so it can be
+    passed wherever the update code would write to vector_store._collection. The
+    writer drops the payload once applied; the job then only reports completion.
+    """
+
+    def __init__(self, collection_name: str, embedding_function):
+        self.collection_name = collection_name
+        self.embedding_function = embedding_function
+        self.upserts = [] # (ids, embeddings, documents, metadatas) per call
+        self.deletes: List[List[str]] = []
+        self.enqueued_at = None
+        self.started_at = None
+        self.finished_at = None
+        self.error: Optional[Exception] = None
+        self._done = threading.Event()
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.upserts.append((list(ids), embeddings, list(documents), list(metadatas))) # Vectors kept as passed, not copied
+
+    def delete(self, ids):
+        self.deletes.append(list(ids))
+
+    @property
+    def modified(self) -> bool:
+        return bool(self.upserts or self.deletes)
+
+    def release(self):
+        """Frees the payload (ids, vectors, texts, metadata) after the writer applied it."""
+        self.upserts = []
+        self.deletes = []
+
+    @property
+    def wait_seconds(self) -> Optional[float]:
+        return None if self.started_at is None else self.started_at - self.enqueued_at
+
+    def wait(self, timeout: float = None):
+        """Blocks until the writer applied (and persisted) the job; re-raises its error."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Write job for '{self.collection_name}' still queued after {timeout}s")
+        if self.error is not None:
+            raise self.error
+
+class IngestionService:
+    """
+    Single writer for the persisted vector store. Sessions prepare their chunks and
+    vectors concurrently, then submit WriteJobs; one background thread applies them in
+    order. Jobs waiting in the queue are coalesced: each collection is written and
+    persisted once per drained batch. An advisory file lock in the persistence
+    directory extends the single-writer guarantee to other app processes. Reads never
+    go through the service.
+    """
+
+    def __init__(self, max_batch: int = None):
+        self.max_batch = max_batch or config.INGESTION_SERVICE_MAX_BATCH
+        self._queue: "queue.Queue[WriteJob]" = queue.Queue()
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._waits = deque(maxlen=_WAIT_HISTORY)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="ingestion-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, job: WriteJob) -> WriteJob:
+        job.enqueued_at = time.time()
+        self._queue.put(job)
+        return job
+
+    # --- Writer Thread ---
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while len(jobs) < self.max_batch:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self._lock:
+                self._active = len(jobs)
+            started = time.time()
+            for job in jobs:
+                job.started_at = started
+            by_collection: Dict[str, List[WriteJob]] = {}
+            for job in jobs:
+                by_collection.setdefault(job.collection_name, []).append(job)
+            for collection_jobs in by_collection.values():
+                self._apply(collection_jobs)
+            with self._lock:
+                self._active = 0
+                self._completed += sum(job.error is None for job in jobs)
+                self._failed += sum(job.error is not None for job in jobs)
+                self._waits.extend(job.wait_seconds for job in jobs)
+            for job in jobs:
+                job.release()
+                job.finished_at = time.time()
+                job._done.set()
+
+    def _apply(self, jobs: List[WriteJob]):
+        from collection_registry import CollectionRegistry
+        from vector_store import _WRITE_BATCH_SIZE, open_vector_store, vector_store_directory
+
+        collection_name = jobs[0].collection_name
+        try:
+            directory = vector_store_directory()
+            with _writer_lock(directory):
+                vector_store = open_vector_store(jobs[0].embedding_function, collection_name)
+                for job in jobs:
+                    for ids, embeddings, documents, metadatas in job.upserts:
+                        for start in range(0, len(ids), _WRITE_BATCH_SIZE):
+                            end = start + _WRITE_BATCH_SIZE
+                            vector_store._collection.upsert(ids=ids[start:end], embeddings=embeddings[start:end],
+                                                            documents=documents[start:end], metadatas=metadatas[start:end])
+                    for ids in job.deletes:
+                        vector_store._collection.delete(ids=ids)
+                modified = any(job.modified for job in jobs)
+                if directory:
+                    if modified:
+                        vector_store.persist()
+                    CollectionRegistry(directory).touch(collection_name, modified=modified)
+            logger.debug(f"Writer applied {len(jobs)} job(s) to '{collection_name}'")
+        except Exception as e:
+            logger.error(f"Writing {len(jobs)} job(s) to '{collection_name}' failed: {e}", exc_info=True)
+            for job in jobs:
+                job.error = e
+
+    def stats(self) -> dict:
+        """Queue depth (waiting + being written), job counts and wait times (seconds from submit to write) of recent jobs."""
+        with self._lock:
+            waits = sorted(self._waits)
+            active = self._active
+        return {
+            "queue_depth": self._queue.qsize() + active,
+            "completed": self._completed,
+            "failed": self._failed,
+            "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+            "wait_max": waits[-1] if waits else 0.0,
+        }
+
+@contextmanager
+def _writer_lock(directory: Optional[str]):
+    """Exclusive advisory lock on <directory>/writer.lock (no-op without a directory or fcntl)."""
+    if not directory or not fcntl:
+        yield
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "writer.lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_ingestion_service() -> Optional[IngestionService]:
+    """The process-wide writer (started on first use), or None if disabled in config."""
+    global _service
+    if not config.INGESTION_SERVICE_ENABLED:
+        return None
+    with _service_lock:
+        if _service is None:
+            _service = IngestionService()
+            logger.info(f"Ingestion writer started (up to {_service.max_batch} jobs per write)")
+    return _service
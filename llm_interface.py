@@ -13,6 +13,11 @@ from langchain_core.runnables import RunnablePassthrough, RunnableParallel
 from langchain_core.output_parsers import StrOutputParser
 
 import config # Import configuration
+from pdf_processor import normalize_part_number
+from retrieval_cache import RetrievalCache, get_retrieval_cache, invoke_filtered
+from vector_store import batch_retrieve
+from query_embeddings import get_query_embeddings
+from context_expansion import expand_to_context
 import asyncio # Need asyncio for crawl4ai
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
@@ -56,6 +61,18 @@ def format_docs(docs: List[Document]) -> str:
         )
     return "\\n\\n---\\n\\n".join(context_parts)
 
+def prefer_table_context(docs: List[Document]) -> List[Document]:
+    """
+    When retrieval returns spec-table records (compact key/value chunks extracted at
+    ingest time), send those plus at most config.TABLE_CONTEXT_TEXT_K prose chunks
+    instead of every large prose chunk.
+    """
+    tables = [doc for doc in docs if doc.metadata.get('content_type') == 'table']
+    if not tables:
+        return docs
+    prose = [doc for doc in docs if doc.metadata.get('content_type') != 'table']
+    return tables + prose[:config.TABLE_CONTEXT_TEXT_K]
+
 @logger.catch(reraise=True)
 def get_answer_from_llm_langchain(question: str, retriever: VectorStoreRetriever) -> Optional[str]:
     """
@@ -403,15 +420,129 @@ async def scrape_website_table_html(part_number: str) -> Optional[str]:
     return None
 
 
+# --- Scoped Retrieval ---
+def scoped_filters(part_number: Optional[str], sources: Optional[List[str]]) -> List[Optional[dict]]:
+    """
+    Metadata filters for one part's retrieval, narrowest first: its part-number tag
+    within the current job's source files, the source files alone, the part-number
+    tag alone (e.g. a store loaded from disk), then None (unfiltered).
+    """
+    part_number = normalize_part_number(part_number)
+    part_clause = {"part_number": part_number} if part_number else None
+    source_clause = {"source": {"$in": list(sources)}} if sources else None
+    filters = []
+    if part_clause and source_clause:
+        filters.append({"$and": [part_clause, source_clause]})
+    if source_clause:
+        filters.append(source_clause)
+    if part_clause:
+        filters.append(part_clause)
+    filters.append(None)
+    return filters
+
+def retrieve_scoped(retriever, query: str, part_number: Optional[str] = None, sources: Optional[List[str]] = None,
+                    cache: Optional[RetrievalCache] = None, query_vector: Optional[List[float]] = None,
+                    query_source: Optional[str] = None) -> List[Document]:
+    """
+    Runs the query with the narrowest filter that returns any chunks (see scoped_filters).
+    With a cache, repeated queries against an unchanged collection skip embedding and search.
+    A given query_vector (see query_embeddings) is searched instead of embedding the query;
+    query_source names how it was built and keeps its cached results apart.
+    """
+    def search(where):
+        if query_vector is not None:
+            return batch_retrieve(retriever, [query], where, [query_vector])[0]
+        return invoke_filtered(retriever, query, where)
+
+    filters = scoped_filters(part_number, sources)
+    for where in filters:
+        try:
+            docs = cache.get(retriever, query, where, query_source) if cache else None
+            if docs is None:
+                docs = search(where)
+                if cache:
+                    cache.put(retriever, query, where, docs, query_source)
+        except Exception as e:
+            logger.warning(f"Filtered retrieval with {where} failed, widening the search: {e}")
+            continue
+        if docs:
+            if where is not filters[0]:
+                logger.debug(f"Retrieval for '{query}' fell back to filter {where}")
+            return docs
+    return []
+
+def pdf_retrieval_query(attribute_key: str, part_number: Optional[str] = "N/A") -> str:
+    """The retriever query the PDF extraction chain issues for one attribute."""
+    return f"Extract information about {attribute_key} for part number {part_number}"
+
+def retrieve_for_attributes(retriever, attribute_keys: List[str], part_number: Optional[str] = None,
+                            sources: Optional[List[str]] = None,
+                            cache: Optional[RetrievalCache] = None) -> Dict[str, List[Document]]:
+    """
+    Batch counterpart of retrieve_scoped for all attributes of one part: cache misses
+    are embedded in one embed_documents call (or combined from precomputed query
+    embeddings, which embeds only the part number) and searched in one multi-query search
+    per filter level, widening only for attributes that found nothing. Returns
+    attribute -> documents, ready for prefer_table_context / format_docs or for the
+    PDF chain's 'context_docs' input.
+    """
+    queries = {key: pdf_retrieval_query(key, part_number if part_number is not None else "N/A") for key in attribute_keys}
+    query_store = get_query_embeddings()
+    query_source = query_store.source_id if query_store else None
+    results: Dict[str, List[Document]] = {}
+    pending = list(dict.fromkeys(attribute_keys))
+    for where in scoped_filters(part_number, sources):
+        if not pending:
+            break
+        misses = []
+        for key in pending:
+            docs = cache.get(retriever, queries[key], where, query_source) if cache else None
+            if docs is None:
+                misses.append(key)
+            else:
+                results[key] = docs
+        if misses:
+            try:
+                vectors = query_store.query_vectors(misses, part_number) if query_store else None
+                batch = batch_retrieve(retriever, [queries[key] for key in misses], where, vectors)
+            except Exception as e:
+                logger.warning(f"Batched retrieval with {where} failed, widening the search: {e}")
+                continue
+            for key, docs in zip(misses, batch):
+                results[key] = docs
+                if cache:
+                    cache.put(retriever, queries[key], where, docs, query_source)
+            logger.debug(f"Batched retrieval of {len(misses)} attribute(s) with filter {where}")
+        pending = [key for key in pending if not results.get(key)]
+    return {key: results.get(key, []) for key in attribute_keys}
+
 # --- PDF Extraction Chain (Using Retriever and Detailed Instructions) ---
-def create_pdf_extraction_chain(retriever, llm):
+def create_pdf_extraction_chain(retriever, llm, sources: Optional[List[str]] = None):
     """
     Creates a RAG chain that uses ONLY PDF context (via retriever)
     and detailed instructions to answer an extraction task.
+    Retrieval is scoped with metadata filters to the input's part number and to
+    sources (the file names of the current job), widening when nothing matches, and
+    goes through the shared retrieval cache (RETRIEVAL_CACHE_ENABLED). Inputs may carry
+    'context_docs' from retrieve_for_attributes to skip the per-attribute retrieval.
+    With precomputed query embeddings (QUERY_EMBEDDINGS_ENABLED) only the part number is embedded.
+    With CHUNKING_STRATEGY="sentence_window" the retrieved windows are expanded to
+    their page or neighbouring windows under EXPANSION_CONTEXT_CHARS (see context_expansion).
     """
     if retriever is None or llm is None:
         logger.error("Retriever or LLM is not initialized for PDF extraction chain.")
         return None
+    retrieval_cache = get_retrieval_cache()
+    query_store = get_query_embeddings()
+
+    def pdf_context(x) -> List[Document]:
+        if x.get('context_docs') is not None:
+            return x['context_docs']
+        part_number = x.get('part_number', 'N/A')
+        query_vector = query_store.query_vector(x['attribute_key'], part_number) if query_store else None
+        return retrieve_scoped(retriever, pdf_retrieval_query(x['attribute_key'], part_number),
+                               x.get('part_number'), sources, retrieval_cache, query_vector,
+                               query_store.source_id if query_store else None)
 
     # Template using only PDF context and detailed instructions passed at runtime
     template = """
@@ -444,7 +575,7 @@ Output:
     # Chain uses retriever to get PDF context
     pdf_chain = (
         RunnableParallel(
-            context=RunnablePassthrough() | (lambda x: retriever.invoke(f"Extract information about {x['attribute_key']} for part number {x.get('part_number', 'N/A')}")) | format_docs,
+            context=RunnablePassthrough() | pdf_context | (lambda docs: expand_to_context(retriever.vectorstore, docs)) | prefer_table_context | format_docs,
             extraction_instructions=RunnablePassthrough(),
             attribute_key=RunnablePassthrough(),
             part_number=RunnablePassthrough()
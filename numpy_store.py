@@ -0,0 +1,396 @@
+# numpy_store.py
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+import config # Import configuration
+
+_SEARCH_BLOCK_ROWS = 16384 # float16 rows are upcast block by block for the matrix product
+_LOAD_ATTEMPTS = 3 # A concurrent persist may remove the data files named by the records just read
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+def matches_where(metadata: dict, where: Optional[dict]) -> bool:
+    """Evaluates a Chroma-style metadata filter: {key: value}, {key: {"$eq"|"$ne"|"$in"|"$nin": ...}}, "$and", "$or"."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+# --- Quantization ---
+def quantize_int8(unit_vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-dimension scalar quantization of unit vectors: (int8 codes, float32 scales)."""
+    scales = (np.abs(unit_vectors).max(axis=0) / 127.0).clip(min=1e-12).astype(np.float32)
+    return np.rint(unit_vectors / scales).clip(-127, 127).astype(np.int8), scales
+
+def quantize_binary(unit_vectors: np.ndarray) -> np.ndarray:
+    """One sign bit per dimension, packed eight to a byte."""
+    return np.packbits(unit_vectors > 0, axis=1)
+
+class _TornVersion(ValueError):
+    """records.json and the vectors file belong to different versions."""
+
+class NumpyCollection:
+    """
+    One collection on disk: vectors-<version>.npy (float16 or float32, memory-mapped
+    read-only) plus records.json holding ids, texts and metadata as parallel columns and
+    the name of the vectors (and codes) file they belong to. Writes are buffered in
+    memory and applied by persist(), which writes new data files and then swaps in
+    records.json atomically, so readers never pair records with other vectors; readers
+    in other processes pick up the new version on their next query.
+    Mirrors the subset of the Chroma collection API the ingestion code uses.
+
+    With quantization ("int8" or "binary") a compact copy of the vectors (codes-<version>.npy)
+    is held in memory and scanned first; only a shortlist of k x rescore_factor rows
+    is then read from the memory-mapped vectors and rescored exactly. dimensions > 0
+    keeps only that many leading dimensions of every vector (fixed per collection once written).
+    """
+
+    def __init__(self, directory: str, dtype: str = None, quantization: str = None, dimensions: int = None):
+        self.directory = directory
+        self.name = os.path.basename(os.path.normpath(directory))
+        self.dtype = np.dtype(dtype or config.NUMPY_STORE_DTYPE)
+        self.quantization = quantization or config.NUMPY_STORE_QUANTIZATION
+        self.rescore_factor = max(1, config.NUMPY_STORE_RESCORE_FACTOR)
+        self._configured_dimensions = config.NUMPY_STORE_DIMENSIONS if dimensions is None else dimensions
+        self.records_path = os.path.join(directory, "records.json")
+        self.vectors_path = os.path.join(directory, "vectors.npy") # Data files of the loaded version, see _load
+        self.codes_path = os.path.join(directory, "codes.npy")
+        self._loaded_mtime = None
+        self._load()
+
+    # --- Loading ---
+    def _load(self):
+        """Loads the current version; retried when a concurrent persist replaces it mid-read."""
+        for attempt in range(_LOAD_ATTEMPTS):
+            try:
+                return self._load_version()
+            except (FileNotFoundError, _TornVersion):
+                if attempt == _LOAD_ATTEMPTS - 1:
+                    raise
+                logger.debug(f"NumPy collection '{self.name}' changed while loading; retrying")
+                time.sleep(0.05)
+
+    def _load_version(self):
+        self._pending_vectors = []
+        self._deleted = set()
+        if os.path.exists(self.records_path):
+            loaded_mtime = os.path.getmtime(self.records_path)
+            with open(self.records_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            self.vectors_path = os.path.join(self.directory, records.get("vectors_file", "vectors.npy")) # Older stores: fixed names
+            self.codes_path = os.path.join(self.directory, records.get("codes_file", "codes.npy"))
+            self._vectors = np.load(self.vectors_path, mmap_mode="r")
+            if len(self._vectors) != len(records["ids"]): # Older stores replaced the vectors before the records
+                raise _TornVersion(f"NumPy collection '{self.name}': {len(self._vectors)} vectors for {len(records['ids'])} records")
+            self._ids = records["ids"]
+            self._documents = records["documents"]
+            self._metadatas = records["metadatas"]
+            self._norms = np.asarray(records["norms"], dtype=np.float32)
+            self._loaded_mtime = loaded_mtime
+            self.dimensions = records.get("dimensions") or self._configured_dimensions
+            if self._configured_dimensions and self.dimensions != self._configured_dimensions:
+                logger.warning(f"NumPy collection '{self.name}' stores {self.dimensions}-dim vectors; "
+                               f"NUMPY_STORE_DIMENSIONS={self._configured_dimensions} applies to new collections only")
+            self._load_codes(records)
+        else:
+            self._ids, self._documents, self._metadatas = [], [], []
+            self._vectors = None
+            self._norms = np.zeros(0, dtype=np.float32)
+            self.dimensions = self._configured_dimensions
+            self._codes, self._scales = None, None
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+
+    def _load_codes(self, records: dict):
+        """Loads the quantized codes into memory, rebuilding them if missing or built for another setting."""
+        self._codes, self._scales = None, None
+        if self.quantization == "none" or not len(self._ids):
+            return
+        if records.get("quantization") == self.quantization and os.path.exists(self.codes_path):
+            self._codes = np.load(self.codes_path)
+            self._scales = np.asarray(records["scales"], dtype=np.float32) if records.get("scales") else None
+        if self._codes is None or len(self._codes) != len(self._ids):
+            logger.info(f"Building {self.quantization} codes for NumPy collection '{self.name}'")
+            self._build_codes(np.asarray(self._vectors, dtype=np.float32))
+
+    def _build_codes(self, vectors: np.ndarray):
+        self._codes, self._scales = None, None
+        if self.quantization == "none" or not len(vectors):
+            return
+        unit_vectors = vectors / np.maximum(self._norms, 1e-12)[:, None]
+        if self.quantization == "int8":
+            self._codes, self._scales = quantize_int8(unit_vectors)
+        elif self.quantization == "binary":
+            self._codes = quantize_binary(unit_vectors)
+        else:
+            raise ValueError(f"Unknown NUMPY_STORE_QUANTIZATION '{self.quantization}' (expected none, int8 or binary)")
+
+    def _reload_if_changed(self):
+        """Reopens the files when another process persisted a newer version (and nothing is pending here)."""
+        if self._pending_vectors or self._deleted or not os.path.exists(self.records_path):
+            return
+        if os.path.getmtime(self.records_path) != self._loaded_mtime:
+            logger.debug(f"Reloading NumPy collection '{self.directory}' after an external update")
+            self._load()
+
+    def _consolidate(self):
+        """Applies buffered upserts and deletes to the in-memory arrays."""
+        if not self._pending_vectors and not self._deleted:
+            return
+        keep = [row for row in range(len(self._ids)) if row not in self._deleted]
+        parts = []
+        base_rows = len(self._ids) - sum(len(part) for part in self._pending_vectors)
+        if self._vectors is not None and base_rows:
+            parts.append(np.asarray(self._vectors[:base_rows], dtype=np.float32))
+        parts.extend(np.asarray(part, dtype=np.float32) for part in self._pending_vectors)
+        vectors = np.concatenate(parts)[keep] if parts else np.zeros((0, 0), dtype=np.float32)
+        self._ids = [self._ids[row] for row in keep]
+        self._documents = [self._documents[row] for row in keep]
+        self._metadatas = [self._metadatas[row] for row in keep]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._vectors = vectors.astype(self.dtype)
+        self._norms = np.linalg.norm(vectors, axis=1).astype(np.float32) if len(vectors) else np.zeros(0, dtype=np.float32)
+        self._build_codes(vectors)
+        self._pending_vectors = []
+        self._deleted = set()
+
+    # --- Chroma-compatible subset ---
+    def count(self) -> int:
+        self._reload_if_changed()
+        return len(self._ids) - len(self._deleted)
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[dict] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        self._reload_if_changed()
+        self._consolidate()
+        include = ["documents", "metadatas"] if include is None else include
+        if ids is None:
+            rows = range(len(self._ids))
+        else:
+            rows = [self._rows[doc_id] for doc_id in ids if doc_id in self._rows]
+        if where:
+            rows = [row for row in rows if matches_where(self._metadatas[row], where)]
+        rows = list(rows)
+        result = {"ids": [self._ids[row] for row in rows]}
+        if "embeddings" in include:
+            result["embeddings"] = [np.asarray(self._vectors[row], dtype=np.float32).tolist() for row in rows]
+        if "documents" in include:
+            result["documents"] = [self._documents[row] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self._metadatas[row] for row in rows]
+        return result
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], documents: List[str], metadatas: List[dict]):
+        for doc_id in ids:
+            if doc_id in self._rows:
+                self._deleted.add(self._rows[doc_id]) # Replaced below by a new row
+        start = len(self._ids)
+        self._ids.extend(ids)
+        self._documents.extend(documents)
+        self._metadatas.extend(dict(metadata) for metadata in metadatas)
+        self._rows.update({doc_id: start + i for i, doc_id in enumerate(ids)})
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if self.dimensions:
+            if vectors.ndim == 2 and vectors.shape[1] < self.dimensions:
+                raise ValueError(f"Got {vectors.shape[1]}-dim vectors for a collection of {self.dimensions} dimensions")
+            vectors = vectors[:, :self.dimensions]
+        self._pending_vectors.append(vectors)
+
+    def delete(self, ids: List[str]):
+        for doc_id in ids:
+            row = self._rows.pop(doc_id, None)
+            if row is not None:
+                self._deleted.add(row)
+
+    def persist(self):
+        """
+        Writes the vectors (and codes) of a new version under new file names, then
+        replaces records.json (temp file + rename) to publish it, removes the previous
+        version's files and maps the new vectors.
+        """
+        self._consolidate()
+        os.makedirs(self.directory, exist_ok=True)
+        vectors = self._vectors if self._vectors is not None else np.zeros((0, 0), dtype=self.dtype)
+        version = uuid.uuid4().hex[:12]
+        vectors_file, codes_file = f"vectors-{version}.npy", f"codes-{version}.npy"
+        np.save(os.path.join(self.directory, vectors_file), np.asarray(vectors, dtype=self.dtype))
+        if self._codes is not None:
+            np.save(os.path.join(self.directory, codes_file), self._codes)
+        previous_files = {self.vectors_path, self.codes_path}
+        temp_records = f"{self.records_path}.tmp"
+        with open(temp_records, "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": self._ids,
+                "documents": self._documents,
+                "metadatas": self._metadatas,
+                "norms": self._norms.tolist(),
+                "dtype": self.dtype.name,
+                "dimensions": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                "quantization": self.quantization if self._codes is not None else "none",
+                "scales": self._scales.tolist() if self._scales is not None else None,
+                "vectors_file": vectors_file,
+                "codes_file": codes_file,
+            }, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_records, self.records_path) # Publishes the new version; readers reload on its mtime
+        for path in previous_files:
+            try:
+                os.remove(path) # Readers that mapped it keep their mapping (POSIX)
+            except OSError:
+                pass
+        self._load()
+
+    # --- Search ---
+    def query(self, embedding: List[float], k: int, where: Optional[dict] = None) -> List[Tuple[int, float]]:
+        """Exact top-k by cosine similarity; returns (row, score) pairs, best first."""
+        return self.query_many([embedding], k, where)[0]
+
+    def query_many(self, embeddings: List[List[float]], k: int, where: Optional[dict] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Top-k for several queries at once: one (rows x queries) matrix product per block
+        over the full vectors, or over the quantized codes followed by exact rescoring
+        of each query's shortlist.
+        """
+        self._reload_if_changed()
+        self._consolidate()
+        if not self._ids or not len(embeddings):
+            return [[] for _ in embeddings]
+        queries = np.asarray(embeddings, dtype=np.float32)[:, :self._vectors.shape[1]]
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True).clip(min=1e-12)
+        scores = self._exact_scores(queries) if self._codes is None else self._approximate_scores(queries)
+        if where:
+            allowed = np.fromiter((matches_where(metadata, where) for metadata in self._metadatas), dtype=bool, count=len(self._ids))
+            scores[~allowed] = -np.inf
+        candidates = int(np.isfinite(scores[:, 0]).sum())
+        shortlist = min(k if self._codes is None else k * self.rescore_factor, candidates)
+        if shortlist <= 0:
+            return [[] for _ in embeddings]
+        top = np.argpartition(-scores, shortlist - 1, axis=0)[:shortlist] # (shortlist x queries), unordered
+        results = []
+        for column in range(len(queries)):
+            rows = top[:, column]
+            if self._codes is None:
+                row_scores = scores[rows, column]
+            else:
+                rows = np.sort(rows) # Ascending rows read the memory map sequentially
+                row_scores = np.asarray(self._vectors[rows], dtype=np.float32) @ queries[column] / np.maximum(self._norms[rows], 1e-12)
+            order = np.argsort(-row_scores)[:k]
+            results.append([(int(rows[i]), float(row_scores[i])) for i in order])
+        return results
+
+    def _exact_scores(self, queries: np.ndarray) -> np.ndarray:
+        scores = np.empty((len(self._ids), len(queries)), dtype=np.float32)
+        for block_start in range(0, len(self._ids), _SEARCH_BLOCK_ROWS):
+            block = np.asarray(self._vectors[block_start:block_start + _SEARCH_BLOCK_ROWS], dtype=np.float32)
+            scores[block_start:block_start + len(block)] = block @ queries.T
+        scores /= np.maximum(self._norms, 1e-12)[:, None]
+        return scores
+
+    def _approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """Shortlisting scores from the codes: int8 dot products, or negative Hamming distances of the sign bits."""
+        scores = np.empty((len(self._ids), len(queries)), dtype=np.float32)
+        if self.quantization == "int8":
+            scaled = (queries * self._scales).T
+            for block_start in range(0, len(self._ids), _SEARCH_BLOCK_ROWS):
+                block = self._codes[block_start:block_start + _SEARCH_BLOCK_ROWS].astype(np.float32)
+                scores[block_start:block_start + len(block)] = block @ scaled
+            return scores
+        query_bits = quantize_binary(queries)
+        for column, bits in enumerate(query_bits):
+            for block_start in range(0, len(self._ids), _SEARCH_BLOCK_ROWS):
+                block = self._codes[block_start:block_start + _SEARCH_BLOCK_ROWS]
+                scores[block_start:block_start + len(block), column] = -_POPCOUNT[block ^ bits].sum(axis=1, dtype=np.float32)
+        return scores
+
+class NumpyVectorStore(VectorStore):
+    """
+    LangChain vector store over a NumpyCollection: exact cosine search with one
+    matrix product over the memory-mapped vectors, no database process or sqlite.
+    """
+
+    def __init__(self, collection_name: str, embedding_function: Embeddings, persist_directory: str = None, dtype: str = None):
+        self.collection_name = collection_name
+        self._embedding_function = embedding_function
+        self.persist_directory = persist_directory or config.NUMPY_STORE_DIRECTORY
+        self._collection = NumpyCollection(os.path.join(self.persist_directory, collection_name), dtype)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        if ids is None:
+            import uuid
+            ids = [str(uuid.uuid4()) for _ in texts]
+        self._collection.upsert(ids, self._embedding_function.embed_documents(texts), texts, metadatas)
+        self._collection.persist()
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs) -> Optional[bool]:
+        if ids:
+            self._collection.delete(ids)
+            self._collection.persist()
+        return True
+
+    def persist(self):
+        self._collection.persist()
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs) -> List[Tuple[Document, float]]:
+        collection = self._collection
+        return [
+            (Document(page_content=collection._documents[row], metadata=dict(collection._metadatas[row])), score)
+            for row, score in collection.query(embedding, k, filter)
+        ]
+
+    def similarity_search_by_vectors(self, embeddings: List[List[float]], k: int = 4, filter: Optional[dict] = None) -> List[List[Document]]:
+        """One exact search for several query vectors; one document list per query."""
+        collection = self._collection
+        return [
+            [Document(page_content=collection._documents[row], metadata=dict(collection._metadatas[row])) for row, _ in hits]
+            for hits in collection.query_many(embeddings, k, filter)
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding_function.embed_query(query), k, filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score # Scores are already cosine similarities
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, collection_name: str = None, persist_directory: str = None, **kwargs) -> "NumpyVectorStore":
+        store = cls(collection_name or config.COLLECTION_NAME, embedding, persist_directory)
+        store.add_texts(texts, metadatas, ids)
+        return store
@@ -0,0 +1,109 @@
+# page_filter.py
+import re
+from functools import lru_cache
+from typing import Optional
+
+from loguru import logger
+
+import config # Import configuration
+
+# Vocabulary of the attributes in extraction_prompts.py (materials, dimensions, sealing, terminals, ...)
+TECHNICAL_KEYWORDS = {
+    "material", "polyamide", "pa", "pa6", "pa66", "pbt", "pps", "lcp", "ppa", "pp", "pc", "pet", "glass", "fiber",
+    "fibre", "gf", "filled", "housing", "connector", "receptacle", "plug", "header", "socket", "female", "male",
+    "gender", "cavity", "cavities", "row", "rows", "pitch", "height", "width", "length", "dimension", "dimensions",
+    "mm", "temperature", "°c", "seal", "sealed", "sealing", "unsealed", "ip67", "ip68", "ip69k", "ip6k9k", "gasket",
+    "wire", "awg", "terminal", "terminals", "contact", "contacts", "tpa", "cpa", "assurance", "coding", "keying",
+    "colour", "color", "black", "natural", "grey", "gray", "latch", "locking", "mating", "pre-assembled", "kit",
+    "voltage", "current", "hv", "rated", "resistance", "insulation", "flammability", "ul94", "specification",
+}
+
+# Phrases typical of pages that never answer an extraction prompt
+BOILERPLATE_PHRASES = (
+    "all rights reserved", "disclaimer", "terms and conditions", "revision history", "change history",
+    "ordering information", "packaging", "trademark", "liability", "copyright", "confidential",
+    "subject to change without notice", "contact us", "sales office",
+)
+
+_WORD_RE = re.compile(r"[A-Za-z°][A-Za-z0-9°\-]*")
+_NUMBER_RE = re.compile(r"\b\d+(?:[.,]\d+)?\b")
+_NUMBER_WITH_UNIT_RE = re.compile(r"\b\d+(?:[.,]\d+)?\s*(?:mm|°\s?C|V|A|N|mΩ|MΩ|AWG|%)(?![A-Za-z])")
+
+class PageFilterStats:
+    """Counts of what the page prefilter kept, down-tiered and skipped."""
+
+    def __init__(self):
+        self.pages_seen = 0
+        self.pages_skipped = 0
+        self.pages_tiered = 0
+        self.tokens_saved = 0
+
+    def merge(self, other: "PageFilterStats"):
+        self.pages_seen += other.pages_seen
+        self.pages_skipped += other.pages_skipped
+        self.pages_tiered += other.pages_tiered
+        self.tokens_saved += other.tokens_saved
+
+    def as_dict(self) -> dict:
+        return {
+            "pages_seen": self.pages_seen,
+            "pages_skipped": self.pages_skipped,
+            "pages_tiered": self.pages_tiered,
+            "tokens_saved": self.tokens_saved,
+        }
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    import tiktoken
+    return tiktoken.get_encoding(config.TIKTOKEN_ENCODING)
+
+def count_tokens(text: str) -> int:
+    """Token count of a text (tiktoken, falling back to a chars/4 estimate)."""
+    try:
+        return len(_get_encoding().encode(text, disallowed_special=()))
+    except Exception:
+        return len(text) // 4
+
+def score_page(text: str) -> float:
+    """
+    Cheap relevance score of a raw page: technical keyword hits, numbers and
+    numbers-with-units per 100 words, minus a penalty per boilerplate phrase.
+    """
+    lowered = text.lower()
+    words = _WORD_RE.findall(lowered)
+    if not words:
+        return 0.0
+    keyword_hits = sum(1 for word in words if word in TECHNICAL_KEYWORDS)
+    number_hits = len(_NUMBER_RE.findall(text))
+    unit_hits = len(_NUMBER_WITH_UNIT_RE.findall(text))
+    boilerplate_hits = sum(1 for phrase in BOILERPLATE_PHRASES if phrase in lowered)
+    density = (keyword_hits + 0.5 * number_hits + 2 * unit_hits) * 100 / max(len(words), 50)
+    return density - 5 * boilerplate_hits
+
+def classify_page(text: str, stats: Optional[PageFilterStats] = None) -> str:
+    """
+    Returns "keep", "tier" (embed a single truncated chunk) or "skip" for a raw page,
+    according to config.PAGE_FILTER_MODE and config.PAGE_FILTER_MIN_SCORE, and
+    records the decision in stats.
+    """
+    if stats is not None:
+        stats.pages_seen += 1
+    if config.PAGE_FILTER_MODE not in ("skip", "tier"):
+        return "keep"
+
+    score = score_page(text)
+    if score >= config.PAGE_FILTER_MIN_SCORE:
+        return "keep"
+
+    if config.PAGE_FILTER_MODE == "skip":
+        if stats is not None:
+            stats.pages_skipped += 1
+            stats.tokens_saved += count_tokens(text)
+        logger.debug(f"Prefilter skipped page (score {score:.1f})")
+        return "skip"
+
+    if stats is not None:
+        stats.pages_tiered += 1
+        stats.tokens_saved += max(count_tokens(text) - count_tokens(text[:config.PAGE_FILTER_TIER_CHARS]), 0)
+    logger.debug(f"Prefilter down-tiered page (score {score:.1f})")
+    return "tier"
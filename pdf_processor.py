@@ -1,14 +1,28 @@
 # pdf_processor.py
+import bisect
+import io
+import mmap
 import os
 import re
-from typing import List, BinaryIO
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Iterator, List, BinaryIO, Optional, Tuple, Union
 from loguru import logger # Using Loguru for nice logging
 
-from langchain_community.document_loaders import PyMuPDFLoader
+import fitz # PyMuPDF, PDFs are opened straight from memory
 from langchain.docstore.document import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 import config # Import configuration
+from ingestion_cache import IngestionCache, hash_pdf_bytes
+from page_filter import PageFilterStats, classify_page
+
+# A PDF source is either an in-memory buffer or a path PyMuPDF can open itself
+PdfSource = Union[bytes, memoryview, str]
+
+_TASKS_IN_FLIGHT_PER_WORKER = 2 # Page-range tasks submitted ahead per worker process in parallel loading
 
 def clean_text(text: str) -> str:
     """Applies basic cleaning to extracted text."""
@@ -18,81 +32,536 @@ def clean_text(text: str) -> str:
     # Add more specific cleaning rules if needed
     return text
 
-def process_uploaded_pdfs(uploaded_files: List[BinaryIO], temp_dir: str = "temp_pdf") -> List[Document]:
-    """Process uploaded PDFs with chunking, maintaining document context."""
-    all_docs = []
-    saved_file_paths = []
-    
-    # Create temp directory if it doesn't exist
-    os.makedirs(temp_dir, exist_ok=True)
-    
-    # Initialize text splitter with config values
-    text_splitter = RecursiveCharacterTextSplitter(
+def _make_text_splitter() -> RecursiveCharacterTextSplitter:
+    """Builds the text splitter for config.CHUNKING_STRATEGY."""
+    if config.CHUNKING_STRATEGY == "document":
+        # Chunk length measured in tiktoken tokens; start_index lets chunks be mapped back to pages
+        return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            encoding_name=config.TIKTOKEN_ENCODING,
+            chunk_size=config.CHUNK_SIZE_TOKENS,
+            chunk_overlap=config.CHUNK_OVERLAP_TOKENS,
+            add_start_index=True,
+        )
+    if config.CHUNKING_STRATEGY == "sentence_window":
+        # Small-to-big: sentence-sized windows per page, expanded again at retrieval (see context_expansion)
+        return RecursiveCharacterTextSplitter(
+            chunk_size=config.SENTENCE_WINDOW_CHARS,
+            chunk_overlap=0,
+            separators=[r"(?<=[.!?;:])\s+", r"\s+", ""],
+            is_separator_regex=True,
+        )
+    return RecursiveCharacterTextSplitter(
         chunk_size=config.CHUNK_SIZE,
         chunk_overlap=config.CHUNK_OVERLAP,
         length_function=len,
         is_separator_regex=False
     )
-    
+
+# --- Compact Chunks ---
+class CompactChunk:
+    """
+    Memory-light chunk: offsets into a text buffer shared by every chunk of the same
+    page (or document), plus the common metadata fields. Overlapping chunks share
+    the buffer instead of holding copies, and pickling a page's chunks to/from the
+    worker processes sends the buffer once. It exposes page_content and metadata
+    like a Document, and to_document() builds the real Document at the LangChain boundary.
+    """
+    __slots__ = ('buffer', 'start', 'end', 'source', 'page', 'chunk', 'total_chunks',
+                 'source_hash', 'content_type', 'extra')
+
+    def __init__(self, buffer: str, start: int, end: int, source: str, page, chunk: int, total_chunks: int,
+                 source_hash: str, content_type: str = 'text', extra: Optional[dict] = None):
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+        self.source = source
+        self.page = page
+        self.chunk = chunk
+        self.total_chunks = total_chunks
+        self.source_hash = source_hash
+        self.content_type = content_type
+        self.extra = extra # Rarely used fields (page spans, table number, relevance tier)
+
+    @property
+    def page_content(self) -> str:
+        return self.buffer[self.start:self.end]
+
+    @property
+    def metadata(self) -> dict:
+        metadata = {
+            'source': self.source,
+            'page': self.page,
+            'chunk': self.chunk,
+            'total_chunks': self.total_chunks,
+            'source_hash': self.source_hash,
+            'content_type': self.content_type
+        }
+        if self.content_type == 'text':
+            metadata['start_index'] = self.start # Offset within the page (or document) text
+        if self.extra:
+            metadata.update(self.extra)
+        return metadata
+
+    def set_extra(self, key: str, value):
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def to_document(self) -> Document:
+        return Document(page_content=self.page_content, metadata=self.metadata)
+
+Chunk = Union[CompactChunk, Document] # What iter_pdf_chunks yields
+
+def materialize(chunks: List[Chunk]) -> List[Document]:
+    """Turns compact chunks into LangChain Documents (Documents pass through)."""
+    return [chunk.to_document() if isinstance(chunk, CompactChunk) else chunk for chunk in chunks]
+
+def _chunk_spans(buffer: str, chunks: List[str]) -> Iterator[Tuple[str, int, int]]:
+    """
+    Locates split chunks in the buffer they came from and yields (buffer, start, end).
+    A chunk that cannot be found verbatim gets its own buffer.
+    """
+    search_from = 0
+    for chunk in chunks:
+        start = buffer.find(chunk, search_from)
+        if start < 0:
+            yield chunk, 0, len(chunk)
+            continue
+        search_from = start + 1
+        yield buffer, start, start + len(chunk)
+
+def _split_page(page_content: str, file_basename: str, page, text_splitter, source_hash: str) -> List[CompactChunk]:
+    """Cleans one page of text and splits it into compact chunks sharing the cleaned page text."""
+    cleaned_content = clean_text(page_content)
+    if not cleaned_content:
+        logger.warning(f"No processable content found in page {page} of {file_basename} after cleaning.")
+        return []
+
+    # Split the cleaned content into chunks
+    chunks = text_splitter.split_text(cleaned_content)
+
+    # Create compact chunks with metadata, all pointing into the cleaned page
+    return [
+        CompactChunk(buffer, start, end, file_basename, page, i + 1, len(chunks), source_hash)
+        for i, (buffer, start, end) in enumerate(_chunk_spans(cleaned_content, chunks))
+    ]
+
+PAGE_SEPARATOR = "\n\n" # Joins cleaned pages in the "document" strategy; also a preferred split point
+
+def _chunk_document(pages: List[Tuple[int, str]], file_basename: str, text_splitter, source_hash: str) -> List[CompactChunk]:
+    """
+    Splits a whole document (cleaned page texts, in page order) into token-sized
+    chunks that may span pages. Each chunk records page_start/page_end; 'page' is
+    kept as the first page so existing consumers still work.
+    """
+    pages = [(page, text) for page, text in pages if text]
+    if not pages:
+        logger.warning(f"No processable content found in {file_basename} after cleaning.")
+        return []
+
+    # Character offset where each page starts in the joined text
+    page_offsets = []
+    offset = 0
+    for _, text in pages:
+        page_offsets.append(offset)
+        offset += len(text) + len(PAGE_SEPARATOR)
+    full_text = PAGE_SEPARATOR.join(text for _, text in pages)
+
+    def page_at(char_index: int):
+        return pages[max(bisect.bisect_right(page_offsets, char_index) - 1, 0)][0]
+
+    chunks = text_splitter.split_text(full_text)
+    docs = []
+    for i, (buffer, start, end) in enumerate(_chunk_spans(full_text, chunks)):
+        start_index = start if buffer is full_text else -1
+        page_start = page_at(start_index)
+        docs.append(CompactChunk(
+            buffer, start, end, file_basename, page_start, i + 1, len(chunks), source_hash,
+            extra={
+                'page_start': page_start,
+                'page_end': page_at(start_index + max(end - start - 1, 0)) if start_index >= 0 else page_start,
+                'start_index': start_index
+            }
+        ))
+    logger.success(f"Split {file_basename} into {len(docs)} document-level chunk(s) over {len(pages)} page(s)")
+    return docs
+
+# --- Table Extraction ---
+def _table_to_records(rows: List[list]) -> List[str]:
+    """
+    Turns extracted table rows into compact records. Two-column spec tables become
+    one "name: value" line per row; wider tables become one line per row with each
+    cell labelled by its column header.
+    """
+    rows = [[clean_text(str(cell)) if cell is not None else "" for cell in row] for row in rows]
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return []
+
+    if all(sum(1 for cell in row if cell) <= 2 for row in rows):
+        return [": ".join(cell for cell in row if cell) for row in rows]
+
+    header, body = rows[0], rows[1:]
+    records = []
+    for row in body:
+        fields = [f"{name or f'Column {j + 1}'}: {cell}" for j, (name, cell) in enumerate(zip(header, row)) if cell]
+        if fields:
+            records.append("; ".join(fields))
+    return records or ["; ".join(cell for cell in header if cell)]
+
+def _extract_tables(page, file_basename: str, source_hash: str) -> List[CompactChunk]:
+    """Detects tables on a PyMuPDF page and returns them as compact key/value chunks."""
+    if not config.EXTRACT_TABLES:
+        return []
+    try:
+        tables = page.find_tables().tables
+    except AttributeError:
+        # find_tables needs PyMuPDF >= 1.23
+        return []
+    except Exception as e:
+        logger.warning(f"Table detection failed on page {page.number} of {file_basename}: {e}")
+        return []
+
+    docs = []
+    for table_index, table in enumerate(tables):
+        records = _table_to_records(table.extract())
+        if not records:
+            continue
+        # Keep very long tables within CHUNK_SIZE characters per chunk
+        blocks = [[]]
+        for record in records:
+            if blocks[-1] and sum(len(r) + 1 for r in blocks[-1]) + len(record) > config.CHUNK_SIZE:
+                blocks.append([])
+            blocks[-1].append(record)
+        for i, block in enumerate(blocks):
+            text = "\n".join(block)
+            docs.append(CompactChunk(
+                text, 0, len(text), file_basename, page.number, i + 1, len(blocks), source_hash,
+                content_type='table', extra={'table': table_index + 1}
+            ))
+    if docs:
+        logger.info(f"Extracted {len(tables)} table(s) as {len(docs)} record chunk(s) from page {page.number} of {file_basename}")
+    return docs
+
+# --- In-memory PDF Sources ---
+def _upload_name(uploaded_file) -> str:
+    """Display name of an upload (Streamlit UploadedFile, file object or path)."""
+    if isinstance(uploaded_file, (str, os.PathLike)):
+        return os.path.basename(os.fspath(uploaded_file))
+    return os.path.basename(getattr(uploaded_file, "name", "uploaded.pdf"))
+
+def _memory_map(file_path: str, stack: ExitStack) -> memoryview:
+    """Memory-maps a file read-only; the mapping is released when the stack closes."""
+    with open(file_path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    def _release():
+        try:
+            view.release()
+            mapped.close()
+        except BufferError:
+            # PyMuPDF still holds a reference; the mapping is closed when it is garbage collected
+            logger.debug(f"Memory map of {file_path} still referenced, leaving it to the garbage collector.")
+
+    stack.callback(_release)
+    return view
+
+def _open_pdf_source(uploaded_file, temp_dir: str, stack: ExitStack) -> PdfSource:
+    """
+    Returns the PDF content of an upload without copying it where possible:
+    - bytes and memoryviews are used as-is,
+    - in-memory uploads (Streamlit UploadedFile / BytesIO) through getvalue(), which shares the existing buffer,
+    - file paths are memory-mapped,
+    - other streams are read into memory, or spooled to temp_dir and memory-mapped above PDF_MMAP_THRESHOLD_MB.
+    """
+    if isinstance(uploaded_file, (bytes, memoryview)):
+        return uploaded_file
+    if isinstance(uploaded_file, bytearray):
+        return memoryview(uploaded_file)
+    if isinstance(uploaded_file, (str, os.PathLike)):
+        return _memory_map(os.fspath(uploaded_file), stack)
+    if isinstance(uploaded_file, io.BytesIO):
+        return uploaded_file.getvalue()
+
+    # Generic binary stream: only touch the disk when it is too large to hold in memory
+    uploaded_file.seek(0, io.SEEK_END)
+    size = uploaded_file.tell()
+    uploaded_file.seek(0)
+    if size <= config.PDF_MMAP_THRESHOLD_MB * 1024 * 1024:
+        return uploaded_file.read()
+
+    os.makedirs(temp_dir, exist_ok=True)
+    file_path = os.path.join(temp_dir, _upload_name(uploaded_file))
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(uploaded_file, f)
+    stack.callback(_remove_temp_file, file_path)
+    logger.info(f"Spooled {_upload_name(uploaded_file)} ({size / 1024 / 1024:.1f} MB) to {file_path} for memory-mapping")
+    return _memory_map(file_path, stack)
+
+def _remove_temp_file(path: str):
+    try:
+        os.remove(path)
+        logger.debug(f"Removed temporary file: {path}")
+    except OSError as e:
+        logger.warning(f"Could not remove temporary file {path}: {e}")
+
+def _open_fitz(source: PdfSource) -> fitz.Document:
+    """Opens a PDF from a path or an in-memory buffer."""
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+# --- Per-page Processing ---
+def _process_page(page, file_basename: str, source_hash: str, text_splitter,
+                  filter_stats: PageFilterStats) -> Tuple[List[CompactChunk], Optional[Tuple[int, str]]]:
+    """
+    Prefilters, cleans and (in the "page" and "sentence_window" strategies) splits one
+    PyMuPDF page. Returns (chunks incl. table records, cleaned page for the "document"
+    strategy or None). A down-tiered page becomes one truncated chunk tagged
+    relevance_tier="low" in every strategy; it is never merged into document chunks.
+    """
+    page_text = page.get_text()
+    decision = classify_page(page_text, filter_stats)
+    if decision == "skip":
+        return [], None
+    if decision == "tier":
+        return _tier_chunk(page_text, file_basename, page.number, source_hash), None
+
+    if config.CHUNKING_STRATEGY == "document":
+        docs, cleaned_page = [], (page.number, clean_text(page_text))
+    else:
+        docs, cleaned_page = _split_page(page_text, file_basename, page.number, text_splitter, source_hash), None
+    docs.extend(_extract_tables(page, file_basename, source_hash))
+    return docs, cleaned_page
+
+def _tier_chunk(page_text: str, file_basename: str, page, source_hash: str) -> List[CompactChunk]:
+    """Low-relevance page: a single chunk of its first PAGE_FILTER_TIER_CHARS cleaned characters, no table records."""
+    text = clean_text(page_text)[:config.PAGE_FILTER_TIER_CHARS]
+    if not text:
+        return []
+    extra = {'relevance_tier': 'low'}
+    if config.CHUNKING_STRATEGY == "document":
+        extra.update(page_start=page, page_end=page) # Like the document-level chunks
+    return [CompactChunk(text, 0, len(text), file_basename, page, 1, 1, source_hash, extra=extra)]
+
+# --- Parallel Ingestion (process pool) ---
+def _process_page_range(task: Tuple[str, str, PdfSource, int, int]) -> Tuple[List[CompactChunk], List[Tuple[int, str]], PageFilterStats]:
+    """
+    Worker: loads pages [page_start, page_stop) of one PDF and processes them with
+    _process_page. Returns (compact chunks, cleaned pages for the "document"
+    strategy, prefilter stats). Compact chunks pickle each shared page buffer once.
+    Runs in a separate process, so it only receives picklable arguments.
+    """
+    file_basename, source_hash, source, page_start, page_stop = task
+    text_splitter = _make_text_splitter()
+    filter_stats = PageFilterStats()
+    docs, pages = [], []
     try:
+        with _open_fitz(source) as pdf:
+            for page_number in range(page_start, page_stop):
+                page_docs, cleaned_page = _process_page(pdf.load_page(page_number), file_basename, source_hash,
+                                                        text_splitter, filter_stats)
+                docs.extend(page_docs)
+                if cleaned_page:
+                    pages.append(cleaned_page)
+    except Exception as e:
+        logger.error(f"Error processing pages {page_start}-{page_stop - 1} of {file_basename}: {e}", exc_info=True)
+    return docs, pages, filter_stats
+
+def _build_page_range_tasks(file_basename: str, source_hash: str, source: PdfSource, pages_per_task: int) -> List[Tuple[str, str, PdfSource, int, int]]:
+    """Splits one PDF into page-range tasks, in page order."""
+    try:
+        with _open_fitz(source) as pdf:
+            page_count = pdf.page_count
+    except Exception as e:
+        logger.error(f"Could not open {file_basename}: {e}", exc_info=True)
+        return []
+    if page_count == 0:
+        logger.warning(f"No pages extracted from {file_basename}")
+        return []
+    # memoryviews cannot be pickled to the workers; send bytes instead
+    if isinstance(source, memoryview):
+        source = source.tobytes()
+    return [
+        (file_basename, source_hash, source, page_start, min(page_start + pages_per_task, page_count))
+        for page_start in range(0, page_count, pages_per_task)
+    ]
+
+def _iter_pdfs_parallel(sources: List[Tuple[str, str, PdfSource, Optional[List[Document]]]], max_workers: int,
+                        filter_stats: PageFilterStats) -> Iterator[List[Chunk]]:
+    """Runs loading, cleaning and splitting across a process pool, yielding results in deterministic order."""
+    pages_per_task = max(1, config.PDF_PAGES_PER_TASK)
+    tasks_per_file = [
+        None if cached_docs is not None else _build_page_range_tasks(file_basename, source_hash, source, pages_per_task)
+        for file_basename, source_hash, source, cached_docs in sources
+    ]
+    task_count = sum(len(tasks) for tasks in tasks_per_file if tasks)
+    if task_count == 0:
+        # Everything came from the cache (or nothing could be opened)
+        for _, _, _, cached_docs in sources:
+            if cached_docs:
+                yield cached_docs
+        return
+
+    workers = min(max_workers or os.cpu_count() or 1, task_count)
+    logger.info(f"Processing {len(sources)} PDF(s) as {task_count} page-range task(s) on {workers} worker process(es)")
+    document_level = config.CHUNKING_STRATEGY == "document"
+    text_splitter = _make_text_splitter() if document_level else None
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # At most _TASKS_IN_FLIGHT_PER_WORKER tasks per worker are submitted at a time (each
+        # carries its PDF's bytes); results are collected in file/page order so the stream is deterministic
+        queued = iter([task for tasks in tasks_per_file if tasks for task in tasks])
+        in_flight = deque()
+
+        def next_result():
+            while len(in_flight) < workers * _TASKS_IN_FLIGHT_PER_WORKER:
+                task = next(queued, None)
+                if task is None:
+                    break
+                in_flight.append(executor.submit(_process_page_range, task))
+            return in_flight.popleft().result()
+
+        for (file_basename, source_hash, _, cached_docs), tasks in zip(sources, tasks_per_file):
+            if cached_docs is not None:
+                if cached_docs:
+                    yield cached_docs
+                continue
+            results = []
+            for _ in tasks:
+                docs, pages, task_stats = next_result()
+                filter_stats.merge(task_stats)
+                if document_level:
+                    results.append((docs, pages))
+                elif docs:
+                    yield docs
+            if document_level:
+                pages = [page for _, task_pages in results for page in task_pages]
+                docs = _chunk_document(pages, file_basename, text_splitter, source_hash)
+                docs.extend(doc for task_docs, _ in results for doc in task_docs) # Table chunks
+                if docs:
+                    yield docs
+
+# --- Part Number Tagging ---
+def normalize_part_number(part_number: Optional[str]) -> Optional[str]:
+    """Canonical form of a user-entered part number, as stored in chunk metadata and used in filters."""
+    part_number = " ".join((part_number or "").split()).upper()
+    return part_number or None
+
+def _tag_part_number(chunks: List[Chunk], part_number: Optional[str]) -> List[Chunk]:
+    """Sets (or clears, e.g. on cache hits from an earlier job) the 'part_number' metadata of each chunk."""
+    for chunk in chunks:
+        if isinstance(chunk, CompactChunk):
+            if part_number:
+                chunk.set_extra('part_number', part_number)
+            elif chunk.extra:
+                chunk.extra.pop('part_number', None)
+        elif part_number:
+            chunk.metadata['part_number'] = part_number
+        else:
+            chunk.metadata.pop('part_number', None)
+    return chunks
+
+def iter_pdf_chunks(uploaded_files: List[BinaryIO], temp_dir: str = "temp_pdf", max_workers: int = None,
+                    cache: Optional[IngestionCache] = None,
+                    filter_stats: Optional[PageFilterStats] = None,
+                    part_number: Optional[str] = None) -> Iterator[List[Chunk]]:
+    """
+    Streams chunk Documents out of the uploaded PDFs, one page (or one page-range
+    task in parallel mode, or one whole PDF with CHUNKING_STRATEGY="document") at a
+    time, so callers can embed while parsing continues.
+    PDFs are opened straight from the upload buffers; temp_dir is only used to spool
+    very large non-buffered streams for memory-mapping.
+    When max_workers (default: config.PDF_INGEST_WORKERS) is not 1, files and page
+    ranges of large files are processed in a process pool; chunks keep the same
+    file/page/chunk order as the serial path.
+    With a cache, PDFs seen before (same bytes and chunking config) are not parsed
+    again; their stored chunks are yielded as one list instead.
+    Pages are run through the relevance prefilter (PAGE_FILTER_MODE); pass
+    filter_stats to collect how many pages and tokens it saved.
+    Every chunk carries the PDF's SHA-256 in its 'source_hash' metadata and, when
+    part_number is given, the normalized part number in 'part_number', so retrieval
+    can be scoped with metadata filters.
+    Parsed chunks are CompactChunks (cache hits are Documents); both expose
+    page_content and metadata, use materialize() where real Documents are needed.
+    """
+    part_number = normalize_part_number(part_number)
+    for chunks in _iter_untagged_chunks(uploaded_files, temp_dir, max_workers, cache, filter_stats):
+        yield _tag_part_number(chunks, part_number)
+
+def _iter_untagged_chunks(uploaded_files: List[BinaryIO], temp_dir: str, max_workers: Optional[int],
+                          cache: Optional[IngestionCache],
+                          filter_stats: Optional[PageFilterStats]) -> Iterator[List[Chunk]]:
+    if max_workers is None:
+        max_workers = config.PDF_INGEST_WORKERS
+    if filter_stats is None:
+        filter_stats = PageFilterStats()
+
+    # Initialize text splitter with config values
+    text_splitter = _make_text_splitter()
+
+    with ExitStack() as stack:
+        sources = []
         for uploaded_file in uploaded_files:
-            file_basename = uploaded_file.name
-            file_path = os.path.join(temp_dir, file_basename)
-            saved_file_paths.append(file_path)
-            
-            # Save uploaded file temporarily
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getvalue())
-            
+            file_basename = _upload_name(uploaded_file)
             try:
-                logger.info(f"Loading PDF: {file_basename}")
-                loader = PyMuPDFLoader(file_path)
-                documents = loader.load()  # List of Docs, one per page
-                
-                if not documents:
-                    logger.warning(f"No pages extracted from {file_basename}")
-                    continue
-                
-                # Process each page and maintain metadata
-                for doc in documents:
-                    # Clean the page content
-                    cleaned_content = clean_text(doc.page_content)
-                    
-                    if cleaned_content:
-                        # Split the cleaned content into chunks
-                        chunks = text_splitter.split_text(cleaned_content)
-                        
-                        # Create Document objects for each chunk with metadata
-                        for i, chunk in enumerate(chunks):
-                            chunk_doc = Document(
-                                page_content=chunk,
-                                metadata={
-                                    'source': file_basename,
-                                    'page': doc.metadata.get('page', 'N/A'),
-                                    'chunk': i + 1,
-                                    'total_chunks': len(chunks)
-                                }
-                            )
-                            all_docs.append(chunk_doc)
-                        
-                        logger.success(f"Successfully processed page {doc.metadata.get('page', 'N/A')} from {file_basename}")
-                    else:
-                        logger.warning(f"No processable content found in page {doc.metadata.get('page', 'N/A')} of {file_basename} after cleaning.")
-                    
+                source = _open_pdf_source(uploaded_file, temp_dir, stack)
             except Exception as e:
-                logger.error(f"Error processing {file_basename}: {e}", exc_info=True)
-                
-    finally:
-        # Clean up temporary files
-        for path in saved_file_paths:
-            try:
-                os.remove(path)
-                logger.debug(f"Removed temporary file: {path}")
-            except OSError as e:
-                logger.warning(f"Could not remove temporary file {path}: {e}")
-    
+                logger.error(f"Could not read upload {file_basename}: {e}", exc_info=True)
+                continue
+            source_hash = hash_pdf_bytes(source)
+            cached_docs = cache.lookup(source_hash, file_basename) if cache else None
+            sources.append((file_basename, source_hash, source, cached_docs))
+
+        if max_workers != 1:
+            yield from _iter_pdfs_parallel(sources, max_workers, filter_stats)
+        else:
+            for file_basename, source_hash, source, cached_docs in sources:
+                if cached_docs is not None:
+                    if cached_docs:
+                        yield cached_docs
+                    continue
+                try:
+                    logger.info(f"Loading PDF: {file_basename}")
+                    with _open_fitz(source) as pdf:
+                        if pdf.page_count == 0:
+                            logger.warning(f"No pages extracted from {file_basename}")
+                            continue
+
+                        # Process each page and maintain metadata
+                        pages, document_docs = [], []
+                        for page in pdf:
+                            page_docs, cleaned_page = _process_page(page, file_basename, source_hash, text_splitter, filter_stats)
+                            if cleaned_page:
+                                pages.append(cleaned_page)
+                                document_docs.extend(page_docs) # Table chunks, yielded with the document
+                            elif page_docs:
+                                logger.success(f"Successfully processed page {page.number} from {file_basename}")
+                                yield page_docs
+
+                        if config.CHUNKING_STRATEGY == "document":
+                            docs = _chunk_document(pages, file_basename, text_splitter, source_hash) + document_docs
+                            if docs:
+                                yield docs
+
+                except Exception as e:
+                    logger.error(f"Error processing {file_basename}: {e}", exc_info=True)
+
+    if filter_stats.pages_skipped or filter_stats.pages_tiered:
+        logger.info(f"Page prefilter: skipped {filter_stats.pages_skipped} and down-tiered {filter_stats.pages_tiered} "
+                    f"of {filter_stats.pages_seen} page(s), saving ~{filter_stats.tokens_saved} tokens")
+
+def process_uploaded_pdfs(uploaded_files: List[BinaryIO], temp_dir: str = "temp_pdf", max_workers: int = None,
+                          cache: Optional[IngestionCache] = None,
+                          filter_stats: Optional[PageFilterStats] = None,
+                          part_number: Optional[str] = None) -> List[Document]:
+    """Process uploaded PDFs with chunking, maintaining document context. See iter_pdf_chunks."""
+    all_docs = []
+    for page_docs in iter_pdf_chunks(uploaded_files, temp_dir, max_workers, cache, filter_stats, part_number):
+        all_docs.extend(materialize(page_docs))
+
     if not all_docs:
         logger.error("No text could be extracted from any provided PDF files.")
-    
+
     logger.info(f"Total document chunks processed: {len(all_docs)}")
-    return all_docs
\ No newline at end of file
+    return all_docs
@@ -0,0 +1,152 @@
+# query_embeddings.py
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+import config # Import configuration
+from embedding_engine import embedding_model_id
+
+# Retrieval query of the PDF chain without its part-number tail (see llm_interface.pdf_retrieval_query)
+ATTRIBUTE_QUERY_TEMPLATE = "Extract information about {attribute_key}"
+PART_NUMBER_QUERY_TEMPLATE = "for part number {part_number}"
+
+# Datasheet vocabulary per attribute; averaged into the attribute's query vector
+ATTRIBUTE_KEYWORDS: Dict[str, List[str]] = {
+    "Material Filling": ["glass fibre filling GF", "reinforcement additive", "PA66-GF30 material filling"],
+    "Material Name": ["housing material", "plastic PA66 PBT PA6", "base polymer"],
+    "Pull-To-Seat": ["pull to seat terminal insertion", "pull-back terminal", "wire pulled to seat contact"],
+    "Gender": ["male female connector", "plug receptacle header", "pin socket gender"],
+    "Height [MM]": ["height mm", "overall height dimension", "H dimension drawing"],
+    "Length [MM]": ["length mm", "overall length dimension", "L dimension drawing"],
+    "Width [MM]": ["width mm", "overall width dimension", "W dimension drawing"],
+    "Number Of Cavities": ["number of cavities", "number of positions ways poles", "cavity count"],
+    "Number Of Rows": ["number of rows", "row count", "single row double row"],
+    "Mechanical Coding": ["mechanical coding keying", "coding variant A B C Z", "polarisation key"],
+    "Colour": ["colour color", "housing colour black natural", "color of housing"],
+    "Colour Coding": ["colour coding", "colour-coded variant", "coding by color"],
+    "Working Temperature": ["operating temperature range", "working temperature min max °C", "temperature class"],
+    "Housing Seal": ["housing seal", "interface seal radial seal", "mat seal peripheral seal"],
+    "Wire Seal": ["wire seal", "single wire seal", "family seal cable seal"],
+    "Sealing": ["sealed unsealed", "sealing", "waterproof"],
+    "Sealing Class": ["IP67 IP6K9K IPx7", "ingress protection class", "sealing class"],
+    "Contact Systems": ["contact system", "terminal system MQS MLK", "compatible terminals"],
+    "Terminal Position Assurance": ["terminal position assurance TPA", "secondary locking", "TPA"],
+    "Connector Position Assurance": ["connector position assurance CPA", "locking lever CPA", "CPA"],
+    "Name Of Closed Cavities": ["closed cavities", "blocked cavity positions", "cavity not used"],
+    "Pre-assembled": ["pre-assembled", "delivered assembled", "assembly state"],
+    "Type Of Connector": ["connector type", "inline connector header plug", "type of connector"],
+    "Set/Kit": ["set kit", "kit contents", "delivered as set"],
+    "HV Qualified": ["high voltage HV qualified", "HV connector", "voltage rating"],
+}
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+class QueryEmbeddingStore:
+    """
+    Precomputed vectors for the fixed parts of the PDF chain's retrieval queries: each
+    attribute's query template and its keyword expansions. They are persisted in an
+    .npz file (per embedding model) and loaded at startup, so an extraction only embeds
+    its part-number phrase, if any, and combines the vectors:
+        normalize(w_t * template + w_k * mean(keywords) + w_p * part number)
+    """
+
+    def __init__(self, embedding_function, path: str = None, keywords: Dict[str, List[str]] = None):
+        self.embedding_function = embedding_function
+        self.path = path or config.QUERY_EMBEDDINGS_PATH
+        self.keywords = ATTRIBUTE_KEYWORDS if keywords is None else keywords
+        self.model_id = f"{embedding_model_id()}|{int(bool(config.NORMALIZE_EMBEDDINGS))}"
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._load()
+        self.ensure(list(self.keywords))
+
+    def _load(self):
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["model"]) != self.model_id:
+                    logger.info(f"Query embeddings in {self.path} are for another model; recomputing")
+                    return
+                self._vectors = dict(zip(data["texts"].tolist(), data["vectors"]))
+            logger.info(f"Loaded {len(self._vectors)} precomputed query embeddings from {self.path}")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable query embeddings file {self.path}: {e}")
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        texts = list(self._vectors)
+        temp_path = f"{self.path}.tmp.npz"
+        np.savez(temp_path, model=np.array(self.model_id), texts=np.array(texts),
+                 vectors=np.stack([self._vectors[text] for text in texts]).astype(np.float32))
+        os.replace(temp_path, self.path)
+
+    def _fixed_texts(self, attribute_key: str) -> List[str]:
+        return [ATTRIBUTE_QUERY_TEMPLATE.format(attribute_key=attribute_key)] + self.keywords.get(attribute_key, [])
+
+    def ensure(self, attribute_keys: List[str]):
+        """Embeds (in one call) and persists the fixed texts of attributes not precomputed yet."""
+        with self._lock:
+            missing = [text for key in attribute_keys for text in self._fixed_texts(key) if text not in self._vectors]
+            missing = list(dict.fromkeys(missing))
+            if not missing:
+                return
+            vectors = self.embedding_function.embed_documents(missing)
+            self._vectors.update((text, np.asarray(vector, dtype=np.float32)) for text, vector in zip(missing, vectors))
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"Could not persist query embeddings to {self.path}: {e}")
+            logger.info(f"Precomputed {len(missing)} query embedding(s)")
+
+    def query_vectors(self, attribute_keys: List[str], part_number: Optional[str] = None) -> List[List[float]]:
+        """
+        Query vectors for the attributes of one part. Only the part-number phrase is
+        embedded (once, shared by all attributes); without a part number nothing is.
+        """
+        self.ensure(attribute_keys)
+        part_vector = None
+        if part_number and part_number != "N/A":
+            text = PART_NUMBER_QUERY_TEMPLATE.format(part_number=part_number)
+            part_vector = _normalize(np.asarray(self.embedding_function.embed_query(text), dtype=np.float32))
+        results = []
+        for key in attribute_keys:
+            template_text, *keyword_texts = self._fixed_texts(key)
+            combined = config.QUERY_TEMPLATE_WEIGHT * _normalize(self._vectors[template_text])
+            if keyword_texts:
+                keywords = np.mean([_normalize(self._vectors[text]) for text in keyword_texts], axis=0)
+                combined = combined + config.QUERY_KEYWORD_WEIGHT * _normalize(keywords)
+            if part_vector is not None:
+                combined = combined + config.QUERY_PART_NUMBER_WEIGHT * part_vector
+            results.append(_normalize(combined).tolist())
+        return results
+
+    def query_vector(self, attribute_key: str, part_number: Optional[str] = None) -> List[float]:
+        return self.query_vectors([attribute_key], part_number)[0]
+
+    @property
+    def source_id(self) -> str:
+        """Identifies how query vectors are built (model and weights); part of retrieval cache keys."""
+        weights = (config.QUERY_TEMPLATE_WEIGHT, config.QUERY_KEYWORD_WEIGHT, config.QUERY_PART_NUMBER_WEIGHT)
+        return f"precomputed|{self.model_id}|{weights}"
+
+_store = None
+_store_lock = threading.Lock()
+
+def load_query_embeddings(embedding_function) -> Optional[QueryEmbeddingStore]:
+    """Loads (or builds) the process-wide store at startup; None if disabled in config."""
+    global _store
+    if not config.QUERY_EMBEDDINGS_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None or _store.embedding_function is not embedding_function:
+            _store = QueryEmbeddingStore(embedding_function)
+    return _store
+
+def get_query_embeddings() -> Optional[QueryEmbeddingStore]:
+    """The store loaded by load_query_embeddings, if any."""
+    return _store
@@ -0,0 +1,102 @@
+# retrieval_cache.py
+import json
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from loguru import logger
+from langchain.docstore.document import Document
+
+import config # Import configuration
+from collection_registry import CollectionRegistry
+
+def collection_version(retriever) -> Optional[Tuple[str, int]]:
+    """
+    (collection name, write version) of the collection behind a retriever, or None when
+    it cannot be determined (unregistered collection): such retrievals are not cached.
+    The version is bumped by every indexing run that changed the collection.
+    """
+    try:
+        name = retriever.vectorstore._collection.name
+    except AttributeError:
+        return None
+    version = CollectionRegistry().version(name)
+    return None if version is None else (name, version)
+
+class RetrievalCache:
+    """
+    LRU cache of retrieval results keyed by (collection, collection version, query
+    source, query, k, filter). A write to the collection bumps its version, so stale
+    results are never served; they simply age out of the LRU. The query source is None
+    for live-embedded queries, else how the query vector was built (e.g.
+    QueryEmbeddingStore.source_id), so toggling precomputed query embeddings never
+    serves results of the other path.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or config.RETRIEVAL_CACHE_SIZE
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, List[Document]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, retriever, query: str, where: Optional[dict], query_source: Optional[str]) -> Optional[tuple]:
+        version = collection_version(retriever)
+        if version is None:
+            return None
+        k = getattr(retriever, "search_kwargs", {}).get("k", config.RETRIEVER_K)
+        return (*version, query_source, query, k, json.dumps(where, sort_keys=True) if where else None)
+
+    def get(self, retriever, query: str, where: Optional[dict] = None, query_source: Optional[str] = None) -> Optional[List[Document]]:
+        """Cached result for the query, or None on a miss (or when the collection is unversioned)."""
+        key = self._key(retriever, query, where, query_source)
+        with self._lock:
+            docs = self._entries.get(key) if key else None
+            if docs is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(docs)
+
+    def put(self, retriever, query: str, where: Optional[dict], docs: List[Document], query_source: Optional[str] = None):
+        key = self._key(retriever, query, where, query_source)
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = list(docs)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def retrieve(self, retriever, query: str, where: Optional[dict] = None) -> List[Document]:
+        """retriever.invoke(query, filter=where), served from the cache when the collection is unchanged."""
+        docs = self.get(retriever, query, where)
+        if docs is None:
+            docs = invoke_filtered(retriever, query, where)
+            self.put(retriever, query, where, docs)
+        return docs
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+def invoke_filtered(retriever, query: str, where: Optional[dict] = None) -> List[Document]:
+    """retriever.invoke with an optional metadata filter (None = unfiltered)."""
+    return retriever.invoke(query, filter=where) if where else retriever.invoke(query)
+
+_shared_cache = None
+
+def get_retrieval_cache() -> Optional[RetrievalCache]:
+    """Process-wide cache shared by all extraction chains, or None if disabled in config."""
+    global _shared_cache
+    if not config.RETRIEVAL_CACHE_ENABLED:
+        return None
+    if _shared_cache is None:
+        _shared_cache = RetrievalCache()
+        logger.info(f"Retrieval cache enabled ({_shared_cache.max_entries} entries)")
+    return _shared_cache
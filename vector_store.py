@@ -1,29 +1,52 @@
 # vector_store.py
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
 from loguru import logger
+import hashlib
 import os
+import queue
+import threading
 import time
 
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain.docstore.document import Document
-from langchain.vectorstores.base import VectorStoreRetriever
-from chromadb import Client as ChromaClient
+from langchain.vectorstores.base import VectorStore
+from langchain_core.retrievers import BaseRetriever
 
 import config # Import configuration
+from collection_registry import CollectionRegistry
+from embedding_cache import CachedEmbeddings, get_embedding_cache
+from embedding_engine import embedding_model_id
+from ingestion_cache import IngestionCache
+from ingestion_service import WriteJob, get_ingestion_service
 
 # --- Embedding Function ---
 @logger.catch(reraise=True) # Automatically log exceptions
-def get_embedding_function():
-    """Initializes and returns the HuggingFace embedding function."""
-    model_kwargs = {'device': config.EMBEDDING_DEVICE}
-    encode_kwargs = {'normalize_embeddings': config.NORMALIZE_EMBEDDINGS}
-
-    embeddings = HuggingFaceEmbeddings(
-        model_name=config.EMBEDDING_MODEL_NAME,
-        model_kwargs=model_kwargs,
-        encode_kwargs=encode_kwargs,
-    )
+def get_embedding_function(use_cache: bool = True):
+    """
+    Initializes and returns the embedding function selected by config.EMBEDDING_BACKEND,
+    wrapped in the persistent embedding cache if enabled and use_cache is True.
+    """
+    if config.EMBEDDING_BACKEND == "batched":
+        from embedding_engine import BatchedEmbeddings
+        logger.info(f"Using batched embedding engine (batch size {config.EMBEDDING_BATCH_SIZE}, processes {config.EMBEDDING_PROCESSES})")
+        embeddings = BatchedEmbeddings()
+    elif config.EMBEDDING_BACKEND == "onnx":
+        from embedding_engine import OnnxEmbeddings
+        embeddings = OnnxEmbeddings()
+    else:
+        model_kwargs = {'device': config.EMBEDDING_DEVICE}
+        encode_kwargs = {'normalize_embeddings': config.NORMALIZE_EMBEDDINGS}
+
+        embeddings = HuggingFaceEmbeddings(
+            model_name=config.EMBEDDING_MODEL_NAME,
+            model_kwargs=model_kwargs,
+            encode_kwargs=encode_kwargs,
+        )
+
+    cache = get_embedding_cache() if use_cache else None
+    if cache is not None:
+        embeddings = CachedEmbeddings(embeddings, cache, model_name=embedding_model_id())
     return embeddings
 
 # --- ChromaDB Setup and Retrieval ---
@@ -39,24 +62,339 @@ def get_chroma_client():
             # Ensure directory exists if persistent
             if config.CHROMA_PERSIST_DIRECTORY and not os.path.exists(config.CHROMA_PERSIST_DIRECTORY):
                  os.makedirs(config.CHROMA_PERSIST_DIRECTORY, exist_ok=True)
+        from chromadb import Client as ChromaClient # Imported lazily: the numpy backend never needs chromadb
         _chroma_client = ChromaClient(config.CHROMA_SETTINGS)
         logger.success("Chroma client initialized.")
     return _chroma_client
 
+# --- Vector Store Backends ---
+def vector_store_directory() -> Optional[str]:
+    """Persistence directory of the configured backend."""
+    if config.VECTOR_STORE_BACKEND == "numpy":
+        return config.NUMPY_STORE_DIRECTORY
+    return config.CHROMA_PERSIST_DIRECTORY
+
+def open_vector_store(embedding_function, collection_name: str = None):
+    """
+    Opens (or creates) the collection in the backend selected by config.VECTOR_STORE_BACKEND.
+    Both backends expose _collection.get/upsert/delete and persist(), which the update
+    code below relies on.
+    """
+    collection_name = collection_name or config.COLLECTION_NAME
+    if config.VECTOR_STORE_BACKEND == "numpy":
+        from numpy_store import NumpyVectorStore
+        return NumpyVectorStore(collection_name, embedding_function, config.NUMPY_STORE_DIRECTORY)
+    vector_store = Chroma(
+        collection_name=collection_name,
+        embedding_function=embedding_function,
+        persist_directory=config.CHROMA_PERSIST_DIRECTORY,
+        collection_metadata=hnsw_metadata(),
+    )
+    _check_hnsw_settings(vector_store._collection)
+    return vector_store
+
+def hnsw_metadata() -> dict:
+    """Chroma collection metadata selecting the HNSW settings from config (applied when a collection is created)."""
+    return {
+        "hnsw:space": config.CHROMA_HNSW_SPACE,
+        "hnsw:M": config.CHROMA_HNSW_M,
+        "hnsw:construction_ef": config.CHROMA_HNSW_CONSTRUCTION_EF,
+        "hnsw:search_ef": config.CHROMA_HNSW_SEARCH_EF,
+    }
+
+def _check_hnsw_settings(collection):
+    """
+    Chroma fixes every HNSW setting, search_ef included, when a collection is created;
+    existing collections keep theirs. Settings the collection's metadata records and
+    that differ from config are logged (keys it does not record cannot be compared).
+    """
+    metadata = collection.metadata or {}
+    differing = {key: metadata[key] for key, value in hnsw_metadata().items() if key in metadata and metadata[key] != value}
+    if differing:
+        logger.warning(f"Chroma collection '{collection.name}' was created with {differing}; "
+                       f"the configured HNSW settings apply to new collections only (re-create it to change them)")
+
+def make_retriever(vector_store) -> BaseRetriever:
+    """
+    Retriever over the store per config.RETRIEVAL_MODE; "hybrid" builds the BM25 index
+    from the stored chunks and rebuilds it after later writes to the collection.
+    """
+    search_kwargs = {"k": config.RETRIEVER_K}
+    if config.RETRIEVAL_MODE == "hybrid":
+        from hybrid_retriever import HybridRetriever
+        retriever = HybridRetriever(
+            vectorstore=vector_store,
+            search_kwargs=search_kwargs,
+            fetch_k=config.HYBRID_FETCH_K,
+            rrf_k=config.HYBRID_RRF_K,
+        )
+        retriever.current_index() # Build the BM25 index now rather than on the first query
+        return retriever
+    return vector_store.as_retriever(search_kwargs=search_kwargs)
+
+# --- Batched Multi-Query Retrieval ---
+def search_by_vectors(vector_store, vectors: List[List[float]], k: int, where: Optional[dict] = None) -> List[List[Document]]:
+    """One multi-query search of the collection; returns one document list per query vector."""
+    if not vectors:
+        return []
+    if config.VECTOR_STORE_BACKEND == "numpy":
+        return vector_store.similarity_search_by_vectors(vectors, k, where)
+    result = vector_store._collection.query(
+        query_embeddings=vectors,
+        n_results=k,
+        where=where or None,
+        include=["documents", "metadatas"],
+    )
+    return [
+        [Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(texts, metadatas)]
+        for texts, metadatas in zip(result["documents"], result["metadatas"])
+    ]
+
+def batch_retrieve(retriever, queries: List[str], where: Optional[dict] = None,
+                   vectors: Optional[List[List[float]]] = None) -> List[List[Document]]:
+    """
+    Retrieves for several queries at once: all queries are embedded in one
+    embed_documents call (unless their vectors are given, e.g. precomputed by
+    query_embeddings) and searched in one multi-query search (fused with BM25 for
+    hybrid retrievers, which first answer exact part-number queries from BM25 alone).
+    Returns one document list per query, as retriever.invoke would.
+    """
+    if not queries:
+        return []
+    vector_store = retriever.vectorstore
+    k = retriever.search_kwargs.get("k", config.RETRIEVER_K)
+    if not hasattr(retriever, "batch_search"):
+        if vectors is None:
+            vectors = vector_store.embeddings.embed_documents(list(queries))
+        return search_by_vectors(vector_store, vectors, k, where)
+
+    # HybridRetriever
+    results = [retriever.exact_part_number_search(query, k, where) for query in queries]
+    dense_rows = [i for i, docs in enumerate(results) if docs is None]
+    if dense_rows:
+        dense_queries = [queries[i] for i in dense_rows]
+        if vectors is None:
+            dense_vectors = vector_store.embeddings.embed_documents(dense_queries)
+        else:
+            dense_vectors = [vectors[i] for i in dense_rows]
+        dense = search_by_vectors(vector_store, dense_vectors, max(retriever.fetch_k, k), where)
+        for i, docs in zip(dense_rows, retriever.batch_search(dense_queries, dense, k, where)):
+            results[i] = docs
+    return results
+
+# --- Deterministic Chunk IDs ---
+def chunk_id(doc) -> str:
+    """
+    Stable ID of a chunk: its PDF's content hash plus a digest of its position
+    (page, content type, table, chunk number, start offset) and text. Processing the
+    same PDF with the same settings always yields the same IDs.
+    """
+    metadata = doc.metadata
+    position = "|".join(str(metadata.get(key, "")) for key in ("page", "content_type", "table", "chunk", "start_index"))
+    digest = hashlib.sha1(f"{position}|{doc.page_content}".encode("utf-8")).hexdigest()[:16]
+    return f"{(metadata.get('source_hash') or 'nohash')[:16]}-{digest}"
+
+def _dedupe_by_id(documents: list, seen: Optional[set] = None) -> Tuple[List[str], list]:
+    """Assigns chunk IDs and drops repeats (e.g. the same PDF uploaded twice under two names)."""
+    seen = set() if seen is None else seen
+    ids, unique_docs = [], []
+    for doc in documents:
+        doc_id = chunk_id(doc)
+        if doc_id in seen:
+            continue
+        seen.add(doc_id)
+        ids.append(doc_id)
+        unique_docs.append(doc)
+    return ids, unique_docs
+
+# --- Ingestion Cache Aware Embedding ---
+class _CachedEmbedder:
+    """
+    Embeds chunk batches, reusing vectors already known (from the collection or the
+    ingestion cache) and recording vectors of new PDFs in the cache. Chunks must arrive
+    in file order (as iter_pdf_chunks yields them), so a PDF is complete once the next
+    one starts. Recorded vectors are truncated to the stored dimension
+    (NUMPY_STORE_DIMENSIONS), like the vectors of already indexed chunks.
+    """
+
+    def __init__(self, embedding_function, cache: Optional[IngestionCache]):
+        self.embedding_function = embedding_function
+        self.cache = cache
+        self._stored_dimensions = config.NUMPY_STORE_DIMENSIONS if config.VECTOR_STORE_BACKEND == "numpy" else 0
+        self._cached_vectors = {} # source_hash -> (vectors, next offset)
+        self._pending_hash = None
+        self._pending_docs = []
+        self._pending_vectors = []
+
+    def _cached_vector(self, source_hash: Optional[str]):
+        if self.cache is None or not source_hash:
+            return None
+        if source_hash not in self._cached_vectors:
+            vectors = self.cache.load_vectors(source_hash) if self.cache.contains(source_hash) else None
+            self._cached_vectors[source_hash] = (vectors, 0)
+        vectors, offset = self._cached_vectors[source_hash]
+        if vectors is None or offset >= len(vectors):
+            return None
+        self._cached_vectors[source_hash] = (vectors, offset + 1)
+        return vectors[offset].tolist()
+
+    def _record(self, doc: Document, vector: List[float]):
+        source_hash = doc.metadata.get('source_hash')
+        if self.cache is None or not source_hash or self._cached_vectors.get(source_hash, (None,))[0] is not None:
+            return
+        if source_hash != self._pending_hash:
+            self.flush()
+            self._pending_hash = source_hash
+        self._pending_docs.append(doc)
+        self._pending_vectors.append(vector[:self._stored_dimensions] if self._stored_dimensions else vector)
+
+    def embed(self, documents: list, known_vectors: Optional[list] = None) -> List[List[float]]:
+        """
+        Returns one vector per document. known_vectors[i], when not None, is used as-is
+        (e.g. the chunk is already in the collection); only the rest are cached or encoded.
+        """
+        known_vectors = known_vectors or [None] * len(documents)
+        vectors = []
+        for doc, known in zip(documents, known_vectors):
+            cached = self._cached_vector(doc.metadata.get('source_hash')) # Keeps cache offsets aligned
+            vectors.append([float(x) for x in known] if known is not None else cached)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            new_vectors = self.embedding_function.embed_documents([documents[i].page_content for i in missing])
+            for i, vector in zip(missing, new_vectors):
+                vectors[i] = vector
+        for doc, vector in zip(documents, vectors):
+            self._record(doc, vector)
+        return vectors
+
+    def flush(self):
+        """Stores the vectors of the PDF currently being recorded."""
+        if self._pending_hash and self._pending_docs:
+            self.cache.store(self._pending_hash, self._pending_docs, self._pending_vectors)
+        self._pending_hash = None
+        self._pending_docs = []
+        self._pending_vectors = []
+
+# --- Incremental Upserts ---
+_WRITE_BATCH_SIZE = 1000 # Chroma limits how many records one call may carry
+_RETAG_KEYS = ("source", "part_number") # Metadata that may change for a chunk whose ID (content) did not
+
+def _tags(metadata: Optional[dict]) -> tuple:
+    return tuple((metadata or {}).get(key) for key in _RETAG_KEYS)
+
+def _upsert_new_chunks(vector_store: VectorStore, ids: List[str], documents: list, embedder: _CachedEmbedder, sink=None) -> int:
+    """
+    Writes the chunks whose IDs are not in the collection yet, with precomputed
+    vectors, and returns how many were written. Chunks already indexed are not
+    re-embedded (their stored vectors only feed the ingestion cache); they are only
+    rewritten, with their stored vectors, when their source name or part-number tag changed.
+    Writes go to sink (e.g. an ingestion_service.WriteJob), default the collection itself.
+    """
+    if not ids:
+        return 0 # Chroma rejects get(ids=[])
+    include = ["embeddings"] if embedder.cache is not None else []
+    existing = vector_store._collection.get(ids=ids, include=include + ["metadatas"])
+    existing_vectors = existing.get("embeddings")
+    if existing_vectors is None:
+        existing_vectors = [None] * len(existing["ids"])
+    known = dict(zip(existing["ids"], existing_vectors))
+    stored_tags = {doc_id: _tags(metadata) for doc_id, metadata in zip(existing["ids"], existing["metadatas"])}
+    retagged = {doc_id for doc_id, doc in zip(ids, documents) if doc_id in stored_tags and stored_tags[doc_id] != _tags(doc.metadata)}
+    if retagged and not include:
+        fetched = vector_store._collection.get(ids=list(retagged), include=["embeddings"])
+        known.update(zip(fetched["ids"], fetched["embeddings"]))
+
+    write = [i for i, doc_id in enumerate(ids) if doc_id not in known or doc_id in retagged]
+    if embedder.cache is not None:
+        # The ingestion cache must see every chunk of a PDF, in order
+        all_vectors = embedder.embed(documents, [known.get(doc_id) for doc_id in ids])
+        vectors = [all_vectors[i] for i in write]
+    else:
+        vectors = embedder.embed([documents[i] for i in write], [known.get(ids[i]) for i in write])
+    sink = sink or vector_store._collection
+    for batch_start in range(0, len(write), _WRITE_BATCH_SIZE):
+        batch = range(batch_start, min(batch_start + _WRITE_BATCH_SIZE, len(write)))
+        sink.upsert(
+            ids=[ids[write[j]] for j in batch],
+            embeddings=[vectors[j] for j in batch],
+            documents=[documents[write[j]].page_content for j in batch],
+            metadatas=[documents[write[j]].metadata for j in batch],
+        )
+    if retagged:
+        logger.info(f"Updated source/part-number tags of {len(retagged)} already indexed chunk(s)")
+    return len(write)
+
+def _source_hashes(documents: list) -> set:
+    return {doc.metadata["source_hash"] for doc in documents if doc.metadata.get("source_hash")}
+
+def _delete_stale_chunks(vector_store: VectorStore, keep_ids: set, source_hashes: set, sink=None) -> int:
+    """
+    Deletes the stored chunks of the re-ingested PDFs (by content hash) that are not in
+    keep_ids, e.g. of an older chunking, and returns the count. Chunks of other PDFs
+    (other sessions' uploads, a restored snapshot) are kept.
+    """
+    if not source_hashes:
+        return 0
+    sink = sink or vector_store._collection
+    where = {"source_hash": {"$in": sorted(source_hashes)}}
+    stale = [doc_id for doc_id in vector_store._collection.get(where=where, include=[])["ids"] if doc_id not in keep_ids]
+    for batch_start in range(0, len(stale), _WRITE_BATCH_SIZE):
+        sink.delete(ids=stale[batch_start:batch_start + _WRITE_BATCH_SIZE])
+    return len(stale)
+
+# --- Write Path ---
+def _new_write_job(collection_name: str, embedding_function) -> Optional[WriteJob]:
+    """A job for the single-writer ingestion service, or None to write directly (service disabled)."""
+    if not vector_store_directory():
+        return None # In-memory store: only this process's instance holds the data
+    return WriteJob(collection_name, embedding_function) if get_ingestion_service() else None
+
+def _commit_writes(vector_store: VectorStore, collection_name: str, persist_directory: Optional[str], modified: bool,
+                   jobs: List[WriteJob] = ()):
+    """
+    Submits the run's write jobs and waits until the writer applied and persisted them,
+    or, writing directly, persists the store and records the write in the registry.
+    """
+    if jobs:
+        service = get_ingestion_service()
+        for job in jobs:
+            if job.enqueued_at is None:
+                service.submit(job)
+        for job in jobs:
+            job.wait()
+        logger.info(f"Ingestion writer applied {len(jobs)} job(s) for '{collection_name}' "
+                    f"(longest wait in queue {max(job.wait_seconds for job in jobs):.2f}s)")
+        return
+    if persist_directory:
+        logger.info(f"Persisting vector store to directory: {persist_directory}")
+        vector_store.persist() # Explicitly call persist just in case
+        CollectionRegistry(persist_directory).touch(collection_name, modified=modified)
+
 # --- Vector Store Setup ---
 @logger.catch(reraise=True)
 def setup_vector_store(
     documents: List[Document],
     embedding_function,
-) -> Optional[VectorStoreRetriever]:
+    cache: Optional[IngestionCache] = None,
+    update_mode: str = None,
+    collection_name: str = None,
+) -> Optional[BaseRetriever]:
     """
-    Sets up the Chroma vector store. Creates a new one if it doesn't exist,
-    or potentially adds to an existing one (current logic replaces).
+    Sets up the vector store (config.VECTOR_STORE_BACKEND). Creates a new one if it doesn't exist, otherwise
+    updates the existing collection in place: every chunk gets a deterministic ID
+    (see chunk_id) and only chunks not yet indexed are embedded and upserted.
     Args:
         documents: List of Langchain Document objects.
         embedding_function: The embedding function to use.
+        cache: Optional ingestion cache; known PDFs are added from their stored
+            vectors and vectors of new PDFs are stored for next time.
+        update_mode: "incremental" (default: config.VECTOR_STORE_UPDATE_MODE) also deletes
+            stored chunks of the uploaded PDFs (same content hash) that are not in
+            documents, e.g. of an older chunking; "append" keeps them.
+        collection_name: Collection to write (default: config.COLLECTION_NAME), e.g. a
+            per-session name from collection_registry.new_collection_name().
     Returns:
-        A VectorStoreRetriever object or None if setup fails.
+        A retriever (see make_retriever) or None if setup fails.
     """
     if not documents:
         logger.warning("No documents provided to setup_vector_store.")
@@ -65,54 +403,171 @@ def setup_vector_store(
         logger.error("Embedding function is not available for setup_vector_store.")
         return None
 
-    persist_directory = config.CHROMA_PERSIST_DIRECTORY
-    collection_name = config.COLLECTION_NAME
+    persist_directory = vector_store_directory()
+    collection_name = collection_name or config.COLLECTION_NAME
+    update_mode = update_mode or config.VECTOR_STORE_UPDATE_MODE
 
     logger.info(f"Setting up vector store. Persistence directory: '{persist_directory}', Collection: '{collection_name}'")
 
-    # Check if the directory exists, maybe Chroma needs it? (Optional check)
-    # if persist_directory and not os.path.exists(persist_directory):
-    #     logger.info(f"Creating persistence directory: {persist_directory}")
-    #     os.makedirs(persist_directory)
-
     try:
-        # If persisting, Chroma.from_documents handles creation and persistence directly
-        # when the persist_directory argument is provided.
-        logger.info(f"Creating/Updating vector store '{collection_name}' with {len(documents)} document chunks...")
-
-        # *** Add persist_directory argument here ***
-        vector_store = Chroma.from_documents(
-            documents=documents,
-            embedding=embedding_function,
-            collection_name=collection_name,
-            persist_directory=persist_directory # <-- This is the crucial addition
-        )
+        logger.info(f"Creating/Updating vector store '{collection_name}' with {len(documents)} document chunks ({update_mode})...")
+
+        vector_store = open_vector_store(embedding_function, collection_name)
+        job = _new_write_job(collection_name, embedding_function)
+        ids, unique_docs = _dedupe_by_id(documents)
+        embedder = _CachedEmbedder(embedding_function, cache)
+        added = _upsert_new_chunks(vector_store, ids, unique_docs, embedder, job)
+        embedder.flush()
+        deleted = _delete_stale_chunks(vector_store, set(ids), _source_hashes(unique_docs), job) if update_mode == "incremental" else 0
+        logger.info(f"Index update: {added} chunk(s) written, {len(ids) - added} unchanged, {deleted} deleted")
 
         # Ensure persistence after creation/update
-        if persist_directory:
-            logger.info(f"Persisting vector store to directory: {persist_directory}")
-            vector_store.persist() # Explicitly call persist just in case
+        _commit_writes(vector_store, collection_name, persist_directory, bool(added or deleted), [job] if job else [])
 
         logger.success(f"Vector store '{collection_name}' created/updated and persisted successfully.")
         # Return the retriever
-        return vector_store.as_retriever(search_kwargs={"k": config.RETRIEVER_K})
+        return make_retriever(vector_store)
 
     except Exception as e:
-        logger.error(f"Failed to create or populate Chroma vector store '{collection_name}': {e}", exc_info=True)
+        logger.error(f"Failed to create or populate vector store '{collection_name}': {e}", exc_info=True)
         return None
 
+# --- Streaming Vector Store Setup ---
+_STREAM_DONE = object() # Sentinel closing the parse -> embed queue
+
+def _produce_batches(document_stream: Iterable[List[Document]], batch_queue: queue.Queue, batch_size: int, stop: threading.Event):
+    """Producer thread: re-batches parsed chunks and feeds them into the bounded queue."""
+    batch = []
+    try:
+        for docs in document_stream:
+            if stop.is_set():
+                return
+            batch.extend(docs)
+            while len(batch) >= batch_size:
+                batch_queue.put(batch[:batch_size]) # Blocks while the embedder is behind
+                batch = batch[batch_size:]
+        if batch:
+            batch_queue.put(batch)
+    except Exception as e:
+        logger.error(f"PDF parsing failed while streaming into the vector store: {e}", exc_info=True)
+        batch_queue.put(e)
+    finally:
+        batch_queue.put(_STREAM_DONE)
+
+@logger.catch(reraise=True)
+def setup_vector_store_streaming(
+    document_stream: Iterable[List[Document]],
+    embedding_function,
+    batch_size: int = None,
+    queue_size: int = None,
+    cache: Optional[IngestionCache] = None,
+    update_mode: str = None,
+    collection_name: str = None,
+) -> Optional[BaseRetriever]:
+    """
+    Streaming variant of setup_vector_store. Parsing runs in a background thread and
+    feeds a bounded queue; this thread embeds and writes each batch as it arrives,
+    so both stages overlap and at most queue_size batches are held in memory.
+    Args:
+        document_stream: Iterable of chunk lists, e.g. pdf_processor.iter_pdf_chunks(...).
+        embedding_function: The embedding function to use.
+        batch_size: Chunks per embedding/write batch (default: config.STREAM_BATCH_SIZE).
+        queue_size: Max batches waiting in the queue (default: config.STREAM_QUEUE_SIZE).
+        cache: Optional ingestion cache, see setup_vector_store.
+        update_mode: "incremental" or "append", see setup_vector_store.
+        collection_name: Collection to write, see setup_vector_store.
+    Returns:
+        A retriever (see make_retriever) or None if nothing was indexed.
+    """
+    if not embedding_function:
+        logger.error("Embedding function is not available for setup_vector_store_streaming.")
+        return None
+
+    batch_size = batch_size or config.STREAM_BATCH_SIZE
+    queue_size = queue_size or config.STREAM_QUEUE_SIZE
+    persist_directory = vector_store_directory()
+    collection_name = collection_name or config.COLLECTION_NAME
+
+    logger.info(f"Streaming documents into vector store '{collection_name}' (batch size {batch_size}, queue size {queue_size})")
+    vector_store = open_vector_store(embedding_function, collection_name)
+
+    batch_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    producer = threading.Thread(
+        target=_produce_batches,
+        args=(document_stream, batch_queue, batch_size, stop),
+        name="pdf-stream-producer",
+        daemon=True,
+    )
+    start_time = time.time()
+    producer.start()
+
+    update_mode = update_mode or config.VECTOR_STORE_UPDATE_MODE
+    embedder = _CachedEmbedder(embedding_function, cache)
+    write_jobs = [] # Completion handles, one per batch; the writer frees each payload once applied
+    seen_ids = set()
+    source_hashes = set() # Content hashes of the streamed PDFs
+    total_chunks = 0
+    added = 0
+    try:
+        while True:
+            item = batch_queue.get()
+            if item is _STREAM_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            batch_start = time.time()
+            ids, unique_docs = _dedupe_by_id(item, seen_ids)
+            if not ids:
+                continue # Every chunk of the batch was already streamed
+            source_hashes |= _source_hashes(unique_docs)
+            job = _new_write_job(collection_name, embedding_function)
+            added += _upsert_new_chunks(vector_store, ids, unique_docs, embedder, job) # Embeds and writes this batch
+            if job:
+                write_jobs.append(get_ingestion_service().submit(job))
+                if len(write_jobs) > queue_size:
+                    write_jobs[-queue_size - 1].wait() # At most queue_size batches awaiting the writer
+            total_chunks += len(unique_docs)
+            logger.debug(f"Indexed batch of {len(item)} chunks in {time.time() - batch_start:.2f}s ({total_chunks} so far)")
+    finally:
+        # Stop and drain so the producer is never left blocked on a full queue
+        stop.set()
+        while producer.is_alive():
+            try:
+                batch_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
+
+    embedder.flush()
+    if total_chunks == 0:
+        logger.warning("No document chunks were streamed into the vector store.")
+        return None
+
+    job = _new_write_job(collection_name, embedding_function)
+    deleted = _delete_stale_chunks(vector_store, seen_ids, source_hashes, job) if update_mode == "incremental" else 0
+    logger.info(f"Index update: {added} chunk(s) written, {total_chunks - added} unchanged, {deleted} deleted")
+    _commit_writes(vector_store, collection_name, persist_directory, bool(added or deleted), write_jobs + ([job] if job else []))
+
+    logger.success(f"Streamed {total_chunks} chunks into '{collection_name}' in {time.time() - start_time:.2f} seconds.")
+    return make_retriever(vector_store)
+
 # --- Load Existing Vector Store ---
 @logger.catch(reraise=True)
-def load_existing_vector_store(embedding_function) -> Optional[VectorStoreRetriever]:
+def load_existing_vector_store(embedding_function, collection_name: str = None) -> Optional[BaseRetriever]:
     """
-    Loads an existing Chroma vector store from the persistent directory.
+    Loads an existing vector store (Chroma or NumPy, per config) from the persistent directory.
     Args:
         embedding_function: The embedding function to use.
+        collection_name: Collection to load (default: config.COLLECTION_NAME). Namespaced
+            collections are only loaded while registered, i.e. not garbage-collected.
+            An empty collection is first restored from config.SNAPSHOT_PATH, if set and
+            exported from that collection.
     Returns:
-        A VectorStoreRetriever object if the store exists and loads, otherwise None.
+        A retriever (see make_retriever) if the store exists and loads, otherwise None.
     """
-    persist_directory = config.CHROMA_PERSIST_DIRECTORY
-    collection_name = config.COLLECTION_NAME
+    persist_directory = vector_store_directory()
+    collection_name = collection_name or config.COLLECTION_NAME
 
     if not persist_directory:
         logger.warning("Persistence directory not configured. Cannot load existing store.")
@@ -121,18 +576,26 @@ def load_existing_vector_store(embedding_function) -> Optional[VectorStoreRetrie
         logger.error("Embedding function is not available for load_existing_vector_store.")
         return None
 
+    if config.SNAPSHOT_PATH:
+        from index_snapshot import restore_if_empty
+        restore_if_empty(embedding_function, collection_name) # Fresh replica: start from the prebuilt index, if exported from this collection
+
     if not os.path.exists(persist_directory):
          logger.warning(f"Persistence directory '{persist_directory}' does not exist. Cannot load.")
          return None
 
+    registry = CollectionRegistry(persist_directory)
+    if collection_name != config.COLLECTION_NAME and not registry.contains(collection_name):
+        logger.info(f"Collection '{collection_name}' is not registered (new or expired). Nothing to load.")
+        return None
+
     logger.info(f"Attempting to load existing vector store from: '{persist_directory}', Collection: '{collection_name}'")
 
     try:
-        vector_store = Chroma(
-            persist_directory=persist_directory,
-            embedding_function=embedding_function,
-            collection_name=collection_name,
-        )
+        vector_store = open_vector_store(embedding_function, collection_name)
+        if config.VECTOR_STORE_BACKEND == "numpy" and vector_store._collection.count() == 0:
+            logger.warning(f"NumPy collection '{collection_name}' in '{persist_directory}' is empty. Cannot load.")
+            return None
         # Simple check to see if it loaded something (e.g., count items)
         # Note: .count() might not exist directly, use a different check if needed
         # A simple successful initialization might be enough indication
@@ -142,8 +605,9 @@ def load_existing_vector_store(embedding_function) -> Optional[VectorStoreRetrie
         # except Exception:
         #      logger.warning(f"Loaded collection '{collection_name}', but could not verify item count.")
 
+        registry.touch(collection_name)
         logger.success(f"Successfully loaded vector store '{collection_name}'.")
-        return vector_store.as_retriever(search_kwargs={"k": config.RETRIEVER_K})
+        return make_retriever(vector_store)
 
     except Exception as e:
         # This exception block might catch cases where the collection *within* the directory doesn't exist